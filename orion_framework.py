@@ -1,12 +1,22 @@
 import os
-import json
+import re
 import time
+import hashlib
+import functools
+import asyncio
 import argparse
-import openai
+import orjson
 # from dotenv import load_dotenv # No longer needed when using Doppler
-from supabase import create_client, Client
-from openai import OpenAI
 from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+# The SDKs below take most of the CLI's start-up time, so they are imported where first used (connecting,
+# pooling, rate limiting); `--help` and argument errors never load them.
+if TYPE_CHECKING:
+    from aiolimiter import AsyncLimiter
+    from openai import OpenAI
+    from supabase import Client
 
 # ==============================================================================
 # IQSF GLOBAL QUEER SAFETY INDEX™ - METHODOLOGY
@@ -47,59 +57,546 @@ METHODOLOGY = {
     ]
 }
 
+def to_json(obj, indent: bool = False) -> str:
+    """Serialises with orjson, which is several times faster than `json` on multi-MB evidence payloads."""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+
+# Sub-points never change at runtime, so their prompt form is built once at import.
+_METHODOLOGY_SUBPOINTS_JSON = {dimension: to_json(sub_points) for dimension, sub_points in METHODOLOGY.items()}
+
+# The system prompt for the scoring and narrative calls, kept first and free of per-report values. It is under
+# OpenAI's 1024-token caching minimum on its own, and the stages differ in model and evidence form, so the calls
+# share no cached prefix with each other; a repeat of the same call (a retry, re-scoring unchanged evidence) does,
+# through the evidence that follows it.
+SYSTEM_METHODOLOGY = f"""You are a Senior IQSF Index Analyst working on the IQSF Global Queer Safety Index™.
+Every analysis is intersectional: assess each identity axis (Gay/Lesbian, Bisexual, Transgender, Non-binary, Intersex) separately within each dimension.
+Evidence is supplied as JSON in which each source is listed once under "sources" and cited by id from the evidence items.
+
+**INDEX METHODOLOGY:** (dimension -> sub-points)
+{to_json(METHODOLOGY)}
+"""
+
+# Score cards are decoded against this schema (strict structured outputs), so the prompt no longer carries an
+# example structure and every reply parses. One score_matrix entry per methodology dimension, in snake_case.
+IDENTITY_AXES = ("gay_lesbian", "bisexual", "transgender", "non_binary", "intersex")
+
+def _strict_object(properties: dict) -> dict:
+    return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+_DIMENSION_SCHEMA = _strict_object({
+    "overall_score": {"type": "number"}, "justification": {"type": "string"},
+    "identity_scores": _strict_object({axis: {"type": "number"} for axis in IDENTITY_AXES}),
+})
+SCORE_CARD_SCHEMA = _strict_object({
+    "country": {"type": "string"}, "overall_weighted_score": {"type": "number"},
+    "score_matrix": _strict_object({re.sub(r"\W+", "_", dimension.lower()): _DIMENSION_SCHEMA for dimension in METHODOLOGY}),
+})
+SCORE_CARD_FORMAT = {"type": "json_schema", "json_schema": {"name": "score_card", "strict": True, "schema": SCORE_CARD_SCHEMA}}
+SCORE_CARDS_FORMAT = {"type": "json_schema", "json_schema": {
+    "name": "score_cards", "strict": True, "schema": _strict_object({"cards": {"type": "array", "items": SCORE_CARD_SCHEMA}})
+}}
+
+# Planner template cache: a dimension's KRQs, with the country swapped for this placeholder, are reused for other
+# countries for as long as the country-neutral prompt (model, wording, sub-points) is unchanged.
+COUNTRY_PLACEHOLDER = "{country}"
+# Words that turn one country's name into another's ("South Sudan", "Equatorial Guinea"), even at a sentence start.
+COUNTRY_NAME_PREFIXES = {"north", "south", "east", "west", "northern", "southern", "eastern", "western", "central", "equatorial", "new", "american"}
+
+# Gatherer worker pool size and the OpenAI request budget it shares (requests per minute).
+GATHER_WORKERS = int(os.environ.get("GATHER_WORKERS", "8"))
+OPENAI_RPM = int(os.environ.get("OPENAI_RPM", "500"))
+# Questions sharing a template are answered for up to this many countries in a single call.
+TEMPLATE_GROUP_MAX = 5
+# Asks the gatherer for a compact, question-agnostic digest of each answer. Scoring and narrative prompts
+# carry these digests instead of the full findings and quotes, which stay in evidence_items for re-expansion.
+EVIDENCE_SUMMARY_INSTRUCTION = '"summary" is a self-contained digest of the findings and their sources in at most 80 words, written so it reads correctly without the question.'
+# Rated in the same call; the narrative reads only the highest-rated answers in full.
+EVIDENCE_RELEVANCE_INSTRUCTION = '"relevance_score" rates from 0 to 1 how much the answer bears on LGBTQ+ safety in the country overall (1 = decisive, 0 = marginal).'
+# Completed answers are buffered and written in one round-trip once this many have accumulated.
+GATHER_FLUSH_SIZE = int(os.environ.get("GATHER_FLUSH_SIZE", "25"))
+
+# Direct Postgres pool used for gatherer writes when SUPABASE_DB_URL is set.
+PG_POOL_MIN_SIZE = 2
+PG_POOL_MAX_SIZE = 20
+
+# OpenAI Batch API limit on requests per input file.
+BATCH_MAX_REQUESTS = 50000
+# Bump whenever the score card prompt changes, so cards cached under the old wording are not replayed.
+SCORE_CARD_PROMPT_VERSION = 4
+
+# Score cards and narratives are drafted by this cheap model; the agent's own model only reviews and polishes the draft.
+DRAFT_MODEL = "gpt-4o-mini"
+# How often the long-running pipeline re-checks for work that arrived from other processes.
+PIPELINE_POLL_SECONDS = 60
+# Pinned sampling: deterministic score cards (so cached replies are the replies you would get again) and capped
+# output, which bounds latency and cost. Narratives keep a little temperature for prose, still seeded.
+LLM_SEED = 42
+SCORE_SAMPLING = {"temperature": 0, "top_p": 1, "seed": LLM_SEED, "max_tokens": 2048}
+# A grouped request gets one card's budget per country, up to the scoring model's (gpt-4o) output limit.
+SCORE_GROUP_MAX_TOKENS = 16384
+NARRATIVE_SAMPLING = {"temperature": 0.3, "top_p": 1, "seed": LLM_SEED, "max_tokens": 4096}
+# Live score card calls allowed in flight at once when several reports are ready.
+SCORE_CONCURRENCY = int(os.environ.get("SCORE_CONCURRENCY", "8"))
+# Narratives streamed in parallel when several scored reports are waiting.
+NARRATE_CONCURRENCY = int(os.environ.get("NARRATE_CONCURRENCY", "4"))
+# Evidence items a narrative reads in detail, by relevance_score; the rest are one-line summaries.
+NARRATIVE_TOP_K = int(os.environ.get("NARRATIVE_TOP_K", "15"))
+# Countries scored together in one live call; a group whose reply is truncated or malformed falls back to per-country calls.
+SCORE_GROUP_MAX = 6
+# Reports claimed per scoring batch; each request carries a full evidence set, so keep files well under the upload cap.
+SCORE_BATCH_SIZE = int(os.environ.get("SCORE_BATCH_SIZE", "50"))
+
+# Streamed long-form generations are checkpointed every this many chunks (roughly tokens).
+STREAM_FLUSH_CHUNKS = 500
+
+# Retries (exponential backoff, honours Retry-After) for 429s, 5xx and connection errors.
+OPENAI_MAX_RETRIES = 5
+# Once a call has exhausted those retries, live calls fail fast for this many seconds rather than queueing behind the outage.
+OPENAI_CIRCUIT_COOLDOWN = int(os.environ.get("OPENAI_CIRCUIT_COOLDOWN", "60"))
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling OpenAI while the circuit breaker is open."""
+
+
+@functools.lru_cache(maxsize=None)
+def openai_transient_errors() -> tuple:
+    """Failures that say nothing about the report: its claim is released for a later run instead of marking it failed."""
+    import openai
+    return (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError, CircuitOpenError)
+
+# One persistent HTTP/2 connection pool per OpenAI client, so calls skip the TLS handshake and multiplex.
+OPENAI_MAX_CONNECTIONS = 100
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = 20
+OPENAI_HTTP_TIMEOUT_SECONDS = 120.0
+
 # ==============================================================================
 # --- 1. CORE FRAMEWORK: THE ABSTRACT AGENT ---
 # ==============================================================================
 
+@functools.lru_cache(maxsize=None)
+def get_clients() -> tuple:
+    """Loads environment variables directly from the environment (injected by Doppler).
+
+    Memoised: every agent in the process shares one Supabase client and one pair of OpenAI clients.
+    """
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_SERVICE_KEY")
+    openai_api_key = os.environ.get("OPENAI_API_KEY")
+    if not all([url, key, openai_api_key]):
+        raise EnvironmentError("Supabase or OpenAI credentials not found. Ensure Doppler is running.")
+    
+    import httpx
+    from openai import OpenAI, AsyncOpenAI
+    from supabase import create_client
+
+    supabase_client = create_client(url, key)
+    limits = httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS)
+    timeout = httpx.Timeout(OPENAI_HTTP_TIMEOUT_SECONDS)
+    openai_client = OpenAI(
+        api_key=openai_api_key, max_retries=OPENAI_MAX_RETRIES,
+        http_client=httpx.Client(http2=True, limits=limits, timeout=timeout)
+    )
+    async_openai_client = AsyncOpenAI(
+        api_key=openai_api_key, max_retries=OPENAI_MAX_RETRIES,
+        http_client=httpx.AsyncClient(http2=True, limits=limits, timeout=timeout)
+    )
+    # Optional: a direct Postgres DSN lets hot paths skip the PostgREST/HTTPS layer.
+    db_url = os.environ.get("SUPABASE_DB_URL")
+    print("-> Connections established.")
+    return supabase_client, openai_client, async_openai_client, db_url
+
 class Agent(ABC):
     """Abstract base class for all IQSF agents."""
-    def __init__(self):
+    model = "gpt-4-turbo"
+    # Process-wide, like the clients: an outage seen by one agent opens the circuit for all of them.
+    _circuit_open_until = 0.0
+
+    def __init__(self, model: str = None, use_cache: bool = True):
         print(f"\n--- Initializing {self.__class__.__name__} ---")
-        self.supabase, self.openai = self._setup_connections()
+        self.model = model or self.model
+        # With use_cache off, responses are still written to the prompt cache but never replayed from it.
+        self.use_cache = use_cache
+        self.supabase, self.openai, self.async_openai, self.db_url = self._setup_connections()
 
     def _setup_connections(self):
-        """Loads environment variables directly from the environment (injected by Doppler)."""
-        url = os.environ.get("SUPABASE_URL")
-        key = os.environ.get("SUPABASE_SERVICE_KEY")
-        openai_api_key = os.environ.get("OPENAI_API_KEY")
-        if not all([url, key, openai_api_key]):
-            raise EnvironmentError("Supabase or OpenAI credentials not found. Ensure Doppler is running.")
-        
-        supabase_client = create_client(url, key)
-        openai_client = OpenAI(api_key=openai_api_key)
-        print("-> Connections established.")
-        return supabase_client, openai_client
+        """Reuses the process-wide clients so additional agents in the same process connect for free."""
+        return get_clients()
+
+    async def _create_pg_pool(self):
+        """Opens an asyncpg pool straight to Postgres, or returns None when SUPABASE_DB_URL is not configured."""
+        if not self.db_url:
+            return None
+        import asyncpg
+        # Supabase's transaction pooler (port 6543) cannot keep prepared statements across transactions, so asyncpg's
+        # statement cache is off; the gatherer's few statements lose little by it.
+        return await asyncpg.create_pool(dsn=self.db_url, min_size=PG_POOL_MIN_SIZE, max_size=PG_POOL_MAX_SIZE, statement_cache_size=0)
+
+    @staticmethod
+    def _prompt_key(request: dict) -> str:
+        """SHA-256 of the canonicalised request, so byte-identical prompts share one cache entry."""
+        return hashlib.sha256(orjson.dumps(request, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+    def _release_reports(self, report_ids: list):
+        """Hands claimed reports back in the status they were claimed from, so another worker can retry them."""
+        if report_ids:
+            self.supabase.rpc('release_reports', {'report_ids': report_ids}).execute()
+            print(f"-> Released report(s) {', '.join(map(str, report_ids))} for a later retry.")
+
+    def _submit_report_batch(self, kind: str, reports: list, build_requests):
+        """Submits a batch for reports whose claim already moved them to a *_SUBMITTED status.
+
+        `build_requests(reports)` returns the (report_id, request) pairs and may drop reports. Until the batch exists
+        nothing will ever ingest the claimed reports, so any failure up to then hands them all back.
+        """
+        try:
+            requests = build_requests(reports)
+            if not requests:
+                return
+            report_ids = [report_id for report_id, _ in requests]
+            batch_id = BatchSubmitter(self.supabase, self.openai).submit(kind, requests, {'report_ids': report_ids})
+        except Exception:
+            self._release_reports([report['id'] for report in reports])
+            raise
+        # Ingestion goes by the job's report_ids, so this is bookkeeping; a failure here loses nothing.
+        try:
+            self.supabase.table('reports').update({'batch_id': batch_id}).in_('id', report_ids).execute()
+        except Exception as e:
+            print(f"-> WARNING: Could not tag reports with batch {batch_id}: {e}")
+        print(f"-> SUBMITTED: Batch {batch_id} queued with {len(report_ids)} {kind} request(s). Run 'poll' to ingest the results.")
+
+    def _cache_get(self, key: str) -> str:
+        if not self.use_cache:
+            return None
+        try:
+            rows = self.supabase.table('prompt_cache').select('response').eq('key', key).limit(1).execute().data
+        except Exception as e:
+            print(f"    -> Prompt cache unavailable: {e}")
+            return None
+        if rows:
+            print("    -> Prompt cache hit.")
+            return rows[0]['response']
+        return None
+
+    def _cache_set(self, key: str, response: str):
+        try:
+            self.supabase.table('prompt_cache').upsert({'key': key, 'response': response}, on_conflict='key', ignore_duplicates=True).execute()
+        except Exception as e:
+            print(f"    -> Could not write prompt cache: {e}")
+
+    def _record_usage(self, usage, model: str, stage: str = None):
+        """Logs prefix-cache hits and records the call's token usage in `llm_usage`, per agent and pipeline stage."""
+        if not usage:
+            return
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = (details.cached_tokens or 0) if details else 0
+        if cached_tokens:
+            print(f"    -> Prefix cache: {cached_tokens}/{usage.prompt_tokens} prompt tokens cached.")
+        try:
+            self.supabase.table('llm_usage').insert({
+                'agent': self.__class__.__name__, 'stage': stage, 'model': model, 'prompt_tokens': usage.prompt_tokens,
+                'completion_tokens': usage.completion_tokens, 'cached_tokens': cached_tokens
+            }).execute()
+        except Exception as e:
+            print(f"    -> Could not record LLM usage: {e}")
+
+    def _complete(self, stage: str = None, **request):
+        """Calls chat completions and records the usage under `stage`."""
+        response = self.openai.chat.completions.create(**request)
+        self._record_usage(response.usage, request.get('model'), stage)
+        return response
+
+    @staticmethod
+    def _check_circuit():
+        if time.monotonic() < Agent._circuit_open_until:
+            raise CircuitOpenError("OpenAI circuit breaker is open after repeated transient failures")
+
+    @staticmethod
+    def _trip_circuit(error: Exception):
+        if not isinstance(error, CircuitOpenError):
+            print(f"    -> OpenAI still failing after {OPENAI_MAX_RETRIES} retries ({error}); pausing live calls for {OPENAI_CIRCUIT_COOLDOWN}s.")
+            Agent._circuit_open_until = time.monotonic() + OPENAI_CIRCUIT_COOLDOWN
+
+    async def _acomplete(self, stage: str = None, **request):
+        """Async variant of `_complete`, behind the circuit breaker."""
+        self._check_circuit()
+        try:
+            response = await self.async_openai.chat.completions.create(**request)
+        except openai_transient_errors() as e:
+            self._trip_circuit(e)
+            raise
+        await asyncio.to_thread(self._record_usage, response.usage, request.get('model'), stage)
+        return response
+
+    def _cached_chat(self, cache_key: str = None, stage: str = None, **request) -> str:
+        """Returns the message content for a chat completion, replaying identical prompts from `prompt_cache`.
+
+        `cache_key` overrides the default key (a hash of the full request) for callers that know a cheaper identity.
+        """
+        key = cache_key or self._prompt_key(request)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        response = self._complete(stage, **request)
+        content = response.choices[0].message.content
+        if response.choices[0].finish_reason == "stop":
+            self._cache_set(key, content)
+        return content
+
+    async def _acached_chat(self, cache_key: str = None, stage: str = None, **request) -> str:
+        """Async variant of `_cached_chat`."""
+        key = cache_key or self._prompt_key(request)
+        cached = await asyncio.to_thread(self._cache_get, key)
+        if cached is not None:
+            return cached
+        response = await self._acomplete(stage, **request)
+        content = response.choices[0].message.content
+        if response.choices[0].finish_reason == "stop":
+            await asyncio.to_thread(self._cache_set, key, content)
+        return content
+
+    async def _stream_completion(self, on_flush=None, echo: bool = True, stage: str = None, **request) -> str:
+        """Streams a chat completion (to stdout when `echo`), passing the partial text to `on_flush` every STREAM_FLUSH_CHUNKS chunks."""
+        key = self._prompt_key(request)
+        cached = await asyncio.to_thread(self._cache_get, key)
+        if cached is not None:
+            return cached
+
+        chunks, usage, finish_reason = [], None, None
+        self._check_circuit()
+        try:
+            stream = await self.async_openai.chat.completions.create(stream=True, stream_options={"include_usage": True}, **request)
+        except openai_transient_errors() as e:
+            self._trip_circuit(e)
+            raise
+        async for chunk in stream:
+            usage = chunk.usage or usage
+            if chunk.choices and chunk.choices[0].finish_reason:
+                finish_reason = chunk.choices[0].finish_reason
+            delta = (chunk.choices[0].delta.content or "") if chunk.choices else ""
+            if echo:
+                print(delta, end="", flush=True)
+            chunks.append(delta)
+            if on_flush and len(chunks) % STREAM_FLUSH_CHUNKS == 0:
+                await asyncio.to_thread(on_flush, "".join(chunks))
+        if echo:
+            print()
+        await asyncio.to_thread(self._record_usage, usage, request.get('model'), stage)
+        content = "".join(chunks)
+        # As in `_cached_chat`: a reply cut off by max_tokens is returned but never replayed.
+        if finish_reason == "stop":
+            await asyncio.to_thread(self._cache_set, key, content)
+        return content
 
     @abstractmethod
     def run(self, **kwargs):
         pass
 
+class BatchSubmitter:
+    """Submits chat completion requests through the OpenAI Batch API and tracks them in `batch_jobs`."""
+    TERMINAL_STATUSES = ('completed', 'expired', 'cancelled', 'failed')
+
+    def __init__(self, supabase: 'Client', openai_client: 'OpenAI'):
+        self.supabase = supabase
+        self.openai = openai_client
+
+    def submit(self, kind: str, requests: list, metadata: dict = None) -> str:
+        """Uploads (custom_id, body) pairs as one JSONL file and records the resulting batch."""
+        lines = [orjson.dumps({"custom_id": str(custom_id), "method": "POST", "url": "/v1/chat/completions", "body": body}) for custom_id, body in requests]
+        batch_file = self.openai.files.create(file=("batch.jsonl", b"\n".join(lines)), purpose="batch")
+        batch = self.openai.batches.create(input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window="24h")
+        self.supabase.table('batch_jobs').insert({'batch_id': batch.id, 'kind': kind, 'status': 'SUBMITTED', 'metadata': metadata or {}}).execute()
+        return batch.id
+
+    def fetch_results(self, batch_id: str) -> tuple:
+        """Returns (status, results) where results maps custom_id to message content, or None while the batch is running."""
+        batch = self.openai.batches.retrieve(batch_id)
+        if batch.status not in self.TERMINAL_STATUSES:
+            return batch.status, None
+
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.openai.files.content(file_id).content.splitlines():
+                item = orjson.loads(line)
+                response = item.get('response') or {}
+                if response.get('status_code') == 200:
+                    results[item['custom_id']] = response['body']['choices'][0]['message']['content']
+                else:
+                    results.setdefault(item['custom_id'], None)
+        return batch.status, results
+
 # ==============================================================================
 # --- 2. CONCRETE AGENTS: THE WORKERS ---
 # ==============================================================================
 
 class PlannerAgent(Agent):
     """Creates a new research plan for a country based on the methodology."""
-    def _generate_questions(self, country_name: str, dimension: str, sub_points: list) -> list:
-        print(f"  -> Generating questions for dimension: '{dimension}'...")
+    model = "gpt-4-turbo-preview"
+
+    def _questions_request(self, country_name: str, dimensions: list) -> dict:
+        sub_points = "\n        ".join(f"- {dimension}: {_METHODOLOGY_SUBPOINTS_JSON[dimension]}" for dimension in dimensions)
         prompt = f"""
-        You are an IQSF Index Analyst generating Key Research Questions (KRQs) for **{country_name}** for the **'{dimension}'** dimension.
+        You are an IQSF Index Analyst generating Key Research Questions (KRQs) for **{country_name}** for each of the dimensions below.
         Your analysis MUST be intersectional. For each sub-point, consider how the issue might differ for various identities within the LGBTQIA+ coalition.
-        Based on these sub-points: {json.dumps(sub_points)}.
-        Return a JSON object: {{"key_research_questions": ["..."]}}
+        Dimensions and their sub-points:
+        {sub_points}
+        Return a JSON object keyed by dimension name: {{"dimensions": {{"<dimension>": {{"key_research_questions": ["..."]}}}}}}
         """
+        return {
+            "model": self.model,
+            "messages": [{"role": "system", "content": "You are a research strategist..."}, {"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"}
+        }
+
+    @staticmethod
+    def _parse_questions(content: str, dimensions: list) -> dict:
+        """Maps each requested dimension the model answered to its list of questions."""
+        answered = orjson.loads(content).get("dimensions", {})
+        return {dimension: answered[dimension].get("key_research_questions", []) for dimension in dimensions if dimension in answered}
+
+    def _lookup_cached_questions(self, dimension: str, key: str) -> list:
+        """Returns the cached question templates for this dimension's country-neutral prompt, or None on a miss."""
+        rows = self.supabase.table('llm_cache').select('response').eq('scope', dimension).eq('prompt_key', key).limit(1).execute().data
+        return rows[0]['response'].get("key_research_questions") if rows else None
+
+    def _store_cached_questions(self, dimension: str, key: str, templates: list):
+        self.supabase.table('llm_cache').upsert(
+            {'scope': dimension, 'prompt_key': key, 'response': {"key_research_questions": templates}}, on_conflict='scope,prompt_key', ignore_duplicates=True
+        ).execute()
+
+    async def _cached_templates(self, dimension: str) -> tuple:
+        """Returns (templates, key) for a dimension from the template cache; templates is None on a miss or with use_cache off."""
+        # The prompt with the placeholder for a country is the same for every country, so an exact key is all it takes.
+        key = self._prompt_key(self._questions_request(COUNTRY_PLACEHOLDER, [dimension]))
+        # Like the prompt cache, --no-cache skips the lookup but still stores the fresh questions.
+        if not self.use_cache:
+            return None, key
         try:
-            response = self.openai.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[{"role": "system", "content": "You are a research strategist..."}, {"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
-            )
-            return json.loads(response.choices[0].message.content).get("key_research_questions", [])
+            return await asyncio.to_thread(self._lookup_cached_questions, dimension, key), key
+        except Exception as e:
+            print(f"    -> Template cache unavailable for '{dimension}': {e}")
+            return None, key
+
+    async def _request_questions(self, country_name: str, dimensions: list) -> dict:
+        print(f"  -> Generating questions for {len(dimensions)} dimension(s) in one call...")
+        try:
+            content = await self._acached_chat(**self._questions_request(country_name, dimensions))
+            return self._parse_questions(content, dimensions)
         except Exception as e:
             print(f"    -> Error generating questions: {e}")
-            return []
+            return {}
+
+    async def _generate_questions(self, country_name: str, dimensions: list) -> dict:
+        """Asks for every dimension at once, retrying any that are missing (e.g. a truncated reply) as two smaller calls."""
+        generated = await self._request_questions(country_name, dimensions)
+        missing = [dimension for dimension in dimensions if dimension not in generated]
+        if missing and len(dimensions) > 1:
+            print(f"    -> {len(missing)} dimension(s) missing from the response; splitting the request.")
+            half = (len(missing) + 1) // 2
+            parts = await asyncio.gather(*[self._request_questions(country_name, part) for part in (missing[:half], missing[half:]) if part])
+            for part in parts:
+                generated.update(part)
+        return generated
+
+    async def _generate_all_questions(self, country_name: str) -> list:
+        """Serves dimensions from the template cache where possible and generates the rest in a single call."""
+        dimensions = list(METHODOLOGY)
+        lookups = await asyncio.gather(*[self._cached_templates(dimension) for dimension in dimensions])
+        questions, keys = {}, {}
+        for dimension, (templates, key) in zip(dimensions, lookups):
+            if templates:
+                print(f"    -> Cache hit for '{dimension}'.")
+                questions[dimension] = [template.replace(COUNTRY_PLACEHOLDER, country_name) for template in templates]
+            else:
+                keys[dimension] = key
+
+        if keys:
+            generated = await self._generate_questions(country_name, list(keys))
+            for dimension, dimension_questions in generated.items():
+                questions[dimension] = dimension_questions
+                templates = self._cacheable_templates(dimension_questions, country_name)
+                if not templates:
+                    continue
+                try:
+                    await asyncio.to_thread(self._store_cached_questions, dimension, keys[dimension], templates)
+                except Exception as e:
+                    print(f"    -> Could not cache questions for '{dimension}': {e}")
+        return [question for dimension in dimensions for question in questions.get(dimension, [])]
+
+    @staticmethod
+    def _question_template(question: str, country_name: str) -> str:
+        """The question with each standalone mention of the country replaced by COUNTRY_PLACEHOLDER.
 
-    def run(self, country: str, pillar_id: int = 3):
+        Only whole names count: "Niger" is left alone inside "Nigeria" or "Niger-Congo", and so is "Sudan" after a
+        capitalised word ("South Sudan"), unless that word merely opens the sentence ("In Sudan").
+        """
+        if not country_name:
+            return None
+
+        def replace(match):
+            preceding = re.search(r"(\S*)\s+([A-Z][\w'-]*)\s+$", " " + question[:match.start()])
+            if preceding:
+                opens_sentence = preceding.group(1)[-1:] in ("", ".", "?", "!", ":", ";")
+                if not opens_sentence or preceding.group(2).casefold() in COUNTRY_NAME_PREFIXES:
+                    return match.group(0)
+            return COUNTRY_PLACEHOLDER
+
+        return re.sub(rf"(?<![\w-]){re.escape(country_name)}(?![\w-])", replace, question)
+
+    @classmethod
+    def _neutral_template(cls, question: str, country_name: str) -> str:
+        """The question's template if it names the country and nothing else ties it to it, else None."""
+        template = cls._question_template(question, country_name)
+        # A question that works through a demonym or a national institution instead (or names the country inside a
+        # longer word) would carry this country's wording over to every other one.
+        if template and COUNTRY_PLACEHOLDER in template and country_name.casefold() not in template.casefold():
+            return template
+        return None
+
+    def _cacheable_templates(self, questions: list, country_name: str) -> list:
+        """The questions as templates, or None unless every one of them is country-neutral."""
+        templates = [self._neutral_template(question, country_name) for question in questions]
+        return templates if templates and all(templates) else None
+
+    def _save_questions(self, report_id: int, country_name: str, all_questions: list):
+        if all_questions:
+            rows = {}
+            for q in all_questions:
+                # Only a country-neutral template groups the question with other countries' in the gatherer.
+                template = self._neutral_template(q, country_name)
+                rows.setdefault(template or q, {"report_id": report_id, "question": q, "question_template": template})
+            self.supabase.table('research_questions').insert(list(rows.values())).execute()
+            print(f"-> SUCCESS: Saved {len(rows)} questions for Report ID {report_id}.")
+        else:
+            self.supabase.table('reports').update({"status": "PLAN_FAILED"}).eq("id", report_id).execute()
+            print("-> ERROR: Failed to generate any questions.")
+
+    def _submit_batch(self, country_name: str, report_id: int):
+        # Two halves rather than one fused prompt: a batch cannot fall back to smaller calls if a reply is truncated.
+        dimensions = list(METHODOLOGY)
+        half = (len(dimensions) + 1) // 2
+        requests = [(index, self._questions_request(country_name, part)) for index, part in enumerate((dimensions[:half], dimensions[half:]))]
+        batch_id = BatchSubmitter(self.supabase, self.openai).submit('plan', requests, {'report_id': report_id, 'country_name': country_name})
+        print(f"-> SUBMITTED: Batch {batch_id} queued for Report ID {report_id}. Run 'poll' to ingest the questions.")
+
+    def ingest_batch(self, job: dict, results: dict):
+        """Saves the questions returned by a completed planner batch."""
+        report_id = job['metadata']['report_id']
+        questions = {}
+        for custom_id, content in results.items():
+            if not content:
+                print(f"    -> Error generating questions for batch request {custom_id}: no output.")
+                continue
+            try:
+                questions.update(self._parse_questions(content, list(METHODOLOGY)))
+            except Exception as e:
+                print(f"    -> Error generating questions for batch request {custom_id}: {e}")
+        all_questions = [question for dimension in METHODOLOGY for question in questions.get(dimension, [])]
+        self._save_questions(report_id, job['metadata'].get('country_name'), all_questions)
+
+    def run(self, country: str, pillar_id: int = 3, batch: bool = False):
         print(f"-> Starting research plan for {country}.")
         response = self.supabase.rpc('create_new_report', {'country_name_input': country, 'pillar_id_input': pillar_id}).execute()
         report_id = response.data
@@ -108,159 +605,725 @@ class PlannerAgent(Agent):
             return
 
         print(f"-> Report entry created with ID: {report_id}")
-        all_questions = []
-        for dimension, sub_points in METHODOLOGY.items():
-            questions = self._generate_questions(country, dimension, sub_points)
-            all_questions.extend(questions)
-        
-        if all_questions:
-            self.supabase.table('research_questions').insert([{"report_id": report_id, "question": q} for q in all_questions]).execute()
-            print(f"-> SUCCESS: Saved {len(all_questions)} questions for Report ID {report_id}.")
-        else:
-            self.supabase.table('reports').update({"status": "PLAN_FAILED"}).eq("id", report_id).execute()
-            print("-> ERROR: Failed to generate any questions.")
+        if batch:
+            self._submit_batch(country, report_id)
+            return
+
+        all_questions = asyncio.run(self._generate_all_questions(country))
+        self._save_questions(report_id, country, all_questions)
 
 class GathererAgent(Agent):
-    """Finds evidence for pending research questions continuously."""
-    def _find_evidence(self, question_text: str) -> dict:
-        print(f"  -> Researching: '{question_text}'")
+    """Finds evidence for pending research questions with a pool of concurrent workers."""
+    # Each call answers one narrow question, so the small model is plenty and ~30x cheaper.
+    model = "gpt-4o-mini"
+
+    def _evidence_request(self, question_text: str) -> dict:
         prompt = f"""
         You are an AI Research Agent. Search your knowledge to answer the following specific question.
         Your response MUST be a single, valid JSON object and nothing else.
         Research Question: "{question_text}"
-        JSON Structure: {{ "question": "{question_text}", "answer_summary": "...", "key_findings": ["..."], "sources": [{{"url": "...", "title": "...", "organization": "...", "quote": "..."}}] }}
+        JSON Structure: {{ "question": "{question_text}", "answer_summary": "...", "key_findings": ["..."], "sources": [{{"url": "...", "title": "...", "organization": "...", "quote": "..."}}], "summary": "...", "relevance_score": 0.5 }}
+        {EVIDENCE_SUMMARY_INSTRUCTION}
+        {EVIDENCE_RELEVANCE_INSTRUCTION}
         """
+        return {
+            "model": self.model,
+            "messages": [{"role": "system", "content": "You are a highly advanced AI Research Agent..."}, {"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"}
+        }
+
+    async def _find_evidence(self, question_text: str, limiter: 'AsyncLimiter') -> dict:
+        print(f"  -> Researching: '{question_text}'")
         try:
-            response = self.openai.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[{"role": "system", "content": "You are a highly advanced AI Research Agent..."}, {"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
-            )
-            return json.loads(response.choices[0].message.content)
+            async with limiter:
+                response = await self.async_openai.chat.completions.create(**self._evidence_request(question_text))
+            return dict(orjson.loads(response.choices[0].message.content), model=self.model)
         except Exception as e:
             print(f"    -> OpenAI Error: {e}")
             return None
 
-    def run(self):
-        print("-> Starting continuous evidence gathering. Press Ctrl+C to stop.")
-        while True:
-            response = self.supabase.rpc('get_next_unanswered_question').execute()
-            question = response.data[0] if response.data else None
-            
-            if not question:
-                print("-> No pending questions found. Worker will now exit.")
-                break
-            
-            question_id = question['id']
-            evidence = self._find_evidence(question['question'])
-            
+    def _shared_evidence_request(self, question_template: str, countries: list) -> dict:
+        prompt = f"""
+        You are an AI Research Agent. Search your knowledge to answer the following research question separately for each listed country.
+        Your response MUST be a single, valid JSON object and nothing else.
+        Research Question (where {COUNTRY_PLACEHOLDER} stands for each country): "{question_template}"
+        Countries: {to_json(countries)}
+        JSON Structure: {{ "answers": {{ "<country>": {{ "answer_summary": "...", "key_findings": ["..."], "sources": [{{"url": "...", "title": "...", "organization": "...", "quote": "..."}}], "summary": "...", "relevance_score": 0.5 }} }} }}
+        {EVIDENCE_SUMMARY_INSTRUCTION}
+        {EVIDENCE_RELEVANCE_INSTRUCTION}
+        """
+        return {
+            "model": self.model,
+            "messages": [{"role": "system", "content": "You are a highly advanced AI Research Agent..."}, {"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"}
+        }
+
+    async def _find_shared_evidence(self, questions: list, limiter: 'AsyncLimiter') -> dict:
+        """Answers one question template for several countries in a single call, fanned out per question id.
+
+        Any country the reply leaves out, names differently or answers with a non-object is asked on its own.
+        """
+        question_template = questions[0]['question_template']
+        countries = [question['country_name'] for question in questions]
+        print(f"  -> Researching for {len(countries)} countries: '{question_template}'")
+        try:
+            async with limiter:
+                response = await self.async_openai.chat.completions.create(**self._shared_evidence_request(question_template, countries))
+            answers = orjson.loads(response.choices[0].message.content).get("answers")
+        except Exception as e:
+            print(f"    -> OpenAI Error: {e}")
+            answers = None
+        if not isinstance(answers, dict):
+            answers = {}
+
+        evidence_by_question, missing = {}, []
+        for question in questions:
+            answer = answers.get(question['country_name'])
+            if isinstance(answer, dict) and answer:
+                evidence_by_question[question['id']] = dict(answer, model=self.model)
+            else:
+                missing.append(question)
+        if missing:
+            print(f"    -> No usable grouped answer for {', '.join(question['country_name'] for question in missing)}; asking one country at a time.")
+            singles = await asyncio.gather(*(self._find_evidence(question['question'], limiter) for question in missing))
+            for question, evidence in zip(missing, singles):
+                evidence_by_question[question['id']] = evidence
+        return evidence_by_question
+
+    @staticmethod
+    def _group_by_template(questions: list) -> list:
+        """Groups claimed questions that share a template, capped at TEMPLATE_GROUP_MAX countries per group."""
+        groups = {}
+        for question in questions:
+            groups.setdefault(question.get('question_template') or question['id'], []).append(question)
+        return [group[i:i + TEMPLATE_GROUP_MAX] for group in groups.values() for i in range(0, len(group), TEMPLATE_GROUP_MAX)]
+
+    @staticmethod
+    def _split_results(evidence_by_question: dict) -> tuple:
+        """Returns (evidence rows, answered question ids, unanswered question ids)."""
+        rows = []
+        for question_id, evidence in evidence_by_question.items():
             if evidence:
                 evidence.pop('question', None)
                 evidence['question_id'] = question_id
-                save_response = self.supabase.table('evidence_items').insert(evidence).execute()
-                
-                if save_response.data:
-                    self.supabase.table('research_questions').update({'status': 'COMPLETE'}).eq('id', question_id).execute()
-                    print(f"  -> SUCCESS: Processed question {question_id}.")
-                else:
-                    self.supabase.table('research_questions').update({'status': 'SAVE_FAILED'}).eq('id', question_id).execute()
-                    print(f"  -> FAILED: Could not save evidence for question {question_id}.")
+                # An unparseable rating only loses the item its ranking, not the whole write.
+                try:
+                    evidence['relevance_score'] = float(evidence['relevance_score'])
+                except (KeyError, TypeError, ValueError):
+                    evidence['relevance_score'] = None
+                # The evidence SQL expands both as JSON arrays; a lone finding or source object is wrapped, nothing is dropped.
+                for field in ('key_findings', 'sources'):
+                    value = evidence.get(field)
+                    evidence[field] = value if isinstance(value, list) else ([] if value is None else [value])
+                rows.append(evidence)
+        found_ids = [row['question_id'] for row in rows]
+        failed_ids = [question_id for question_id, evidence in evidence_by_question.items() if not evidence]
+        return rows, found_ids, failed_ids
+
+    def _save_evidence_bulk(self, evidence_by_question: dict):
+        """Saves many results at once: one `complete_questions` RPC plus one update for failed questions."""
+        rows, found_ids, failed_ids = self._split_results(evidence_by_question)
+        if rows:
+            try:
+                self.supabase.rpc('complete_questions', {'ids': found_ids, 'evidence': rows}).execute()
+                print(f"  -> SUCCESS: Processed {len(found_ids)} questions.")
+            except Exception as e:
+                self.supabase.table('research_questions').update({'status': 'SAVE_FAILED'}).in_('id', found_ids).execute()
+                print(f"  -> FAILED: Could not save evidence for {len(found_ids)} questions: {e}")
+        if failed_ids:
+            self.supabase.table('research_questions').update({'status': 'RESEARCH_FAILED'}).in_('id', failed_ids).execute()
+            print(f"  -> FAILED: Could not find evidence for {len(failed_ids)} questions.")
+
+    async def _save_evidence_pg(self, evidence_by_question: dict):
+        """Same as `_save_evidence_bulk`, but over the asyncpg pool inside a single transaction."""
+        rows, found_ids, failed_ids = self._split_results(evidence_by_question)
+        async with self._pool.acquire() as conn:
+            if rows:
+                try:
+                    async with conn.transaction():
+                        await conn.executemany(
+                            "INSERT INTO evidence_items (question_id, answer_summary, key_findings, sources, model, summary, relevance_score) VALUES ($1, $2, $3, $4, $5, $6, $7)",
+                            [
+                                (row['question_id'], row.get('answer_summary'), to_json(row.get('key_findings') or []), to_json(row.get('sources') or []), row.get('model'), row.get('summary'), row['relevance_score'])
+                                for row in rows
+                            ]
+                        )
+                        await conn.execute("UPDATE research_questions SET status = 'COMPLETE' WHERE id = ANY($1::bigint[])", found_ids)
+                    print(f"  -> SUCCESS: Processed {len(found_ids)} questions.")
+                except Exception as e:
+                    await conn.execute("UPDATE research_questions SET status = 'SAVE_FAILED' WHERE id = ANY($1::bigint[])", found_ids)
+                    print(f"  -> FAILED: Could not save evidence for {len(found_ids)} questions: {e}")
+            if failed_ids:
+                await conn.execute("UPDATE research_questions SET status = 'RESEARCH_FAILED' WHERE id = ANY($1::bigint[])", failed_ids)
+                print(f"  -> FAILED: Could not find evidence for {len(failed_ids)} questions.")
+
+    def _release_questions(self, question_ids: list):
+        """Hands claimed questions that were never answered back to PENDING, so the next gatherer picks them up."""
+        if question_ids:
+            self.supabase.rpc('release_questions', {'question_ids': question_ids}).execute()
+            print(f"-> Released {len(question_ids)} unanswered question(s) back to PENDING.")
+
+    async def _flush(self):
+        buffer, self._buffer = self._buffer, {}
+        if not buffer:
+            return
+        try:
+            if self._pool:
+                await self._save_evidence_pg(buffer)
             else:
-                self.supabase.table('research_questions').update({'status': 'RESEARCH_FAILED'}).eq('id', question_id).execute()
-                print(f"  -> FAILED: Could not find evidence for question {question_id}.")
+                await asyncio.to_thread(self._save_evidence_bulk, buffer)
+        except Exception:
+            await asyncio.to_thread(self._release_questions, list(buffer))
+            raise
+        finally:
+            self._claimed.difference_update(buffer)
+        if self._on_saved:
+            self._on_saved()
+
+    async def _worker(self, queue: asyncio.Queue, limiter: 'AsyncLimiter'):
+        while True:
+            group = await queue.get()
+            try:
+                if len(group) == 1:
+                    self._buffer[group[0]['id']] = await self._find_evidence(group[0]['question'], limiter)
+                else:
+                    self._buffer.update(await self._find_shared_evidence(group, limiter))
+                if len(self._buffer) >= GATHER_FLUSH_SIZE:
+                    await self._flush()
+            except Exception as e:
+                print(f"  -> FAILED: Unexpected error on questions {[question['id'] for question in group]}: {e}")
+                # Answers already buffered are written by the next flush; the rest of the group goes back to PENDING.
+                unanswered = [question['id'] for question in group if question['id'] in self._claimed and question['id'] not in self._buffer]
+                self._claimed.difference_update(unanswered)
+                await asyncio.to_thread(self._release_questions, unanswered)
+            finally:
+                queue.task_done()
+
+    async def _listen(self, wakeup: asyncio.Event):
+        """Holds a pooled connection that sets `wakeup` on every `new_question` notification."""
+        listener = await self._pool.acquire()
+        await listener.add_listener('new_question', lambda *args: wakeup.set())
+        return listener
+
+    async def _gather(self, workers: int, follow: bool = False, on_saved=None):
+        """Claims pending questions in batches and feeds them to the worker pool.
+
+        Exits once the queue is drained, unless `follow` is set, in which case it sleeps until Postgres notifies it
+        of new or released questions, or PIPELINE_POLL_SECONDS pass. `on_saved` is called after every write of answers.
+        """
+        # Claimed question ids not yet written; whatever is left on exit (Ctrl+C, a crash) is released.
+        self._buffer, self._on_saved, self._claimed = {}, on_saved, set()
+        self._pool = await self._create_pg_pool()
+        if follow and not self._pool:
+            print("-> WARNING: --follow needs SUPABASE_DB_URL for LISTEN/NOTIFY; exiting once the queue is drained.")
+        wakeup = asyncio.Event()
+        listener = await self._listen(wakeup) if follow and self._pool else None
+
+        from aiolimiter import AsyncLimiter
+        limiter = AsyncLimiter(OPENAI_RPM, 60)
+        queue = asyncio.Queue(maxsize=workers)
+        tasks = [asyncio.create_task(self._worker(queue, limiter)) for _ in range(workers)]
+        try:
+            while True:
+                wakeup.clear()
+                response = await asyncio.to_thread(self.supabase.rpc('get_next_unanswered_questions', {'limit_input': workers * TEMPLATE_GROUP_MAX}).execute)
+                if response.data:
+                    self._claimed.update(question['id'] for question in response.data)
+                    for group in self._group_by_template(response.data):
+                        await queue.put(group)
+                    continue
+                if not listener:
+                    break
+                await queue.join()
+                await self._flush()
+                print("-> Queue drained. Waiting for new questions...")
+                # Expired claims send no notification, and a transaction-mode pooler delivers none at all.
+                try:
+                    await asyncio.wait_for(wakeup.wait(), PIPELINE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                await self._flush()
+            finally:
+                await asyncio.to_thread(self._release_questions, list(self._claimed))
+            if listener:
+                # Releasing resets the connection, which UNLISTENs and drops the callback.
+                await self._pool.release(listener)
+            if self._pool:
+                await self._pool.close()
+
+    def _submit_batch(self):
+        response = self.supabase.rpc('get_next_unanswered_questions', {'limit_input': BATCH_MAX_REQUESTS}).execute()
+        if not response.data:
+            print("-> No pending questions found.")
+            return
+        question_ids = [question['id'] for question in response.data]
+        requests = [(question['id'], self._evidence_request(question['question'])) for question in response.data]
+        try:
+            batch_id = BatchSubmitter(self.supabase, self.openai).submit('gather', requests, {'question_ids': question_ids, 'model': self.model})
+        except Exception:
+            self._release_questions(question_ids)
+            raise
+        # The batch owns these questions for up to 24 hours, so their claims must not expire like a live worker's.
+        self.supabase.table('research_questions').update({'claimed_at': None}).in_('id', question_ids).execute()
+        print(f"-> SUBMITTED: Batch {batch_id} queued with {len(question_ids)} questions. Run 'poll' to ingest the evidence.")
+
+    def ingest_batch(self, job: dict, results: dict):
+        """Saves the evidence returned by a completed gatherer batch; questions it returned nothing for go back to PENDING."""
+        evidence_by_question, unanswered = {}, []
+        for question_id in job['metadata']['question_ids']:
+            content = results.get(str(question_id))
+            if content is None:
+                # An expired, cancelled or failed batch returns nothing for some questions; that is no fault of theirs.
+                unanswered.append(question_id)
+                continue
+            try:
+                evidence_by_question[question_id] = dict(orjson.loads(content), model=job['metadata'].get('model', self.model))
+            except Exception as e:
+                print(f"    -> Invalid evidence for question {question_id}: {e}")
+                evidence_by_question[question_id] = None
+        self._save_evidence_bulk(evidence_by_question)
+        self._release_questions(unanswered)
+
+    def run(self, workers: int = GATHER_WORKERS, batch: bool = False, follow: bool = False):
+        if batch:
+            print("-> Draining all pending questions into one OpenAI batch.")
+            self._submit_batch()
+            return
+
+        print(f"-> Starting evidence gathering with {workers} workers. Press Ctrl+C to stop.")
+        asyncio.run(self._gather(workers, follow))
+        print("-> No pending questions found. Worker will now exit.")
 
 class ScoringAgent(Agent):
     """Analyzes evidence and generates an IQSF Index Score Card."""
-    def _generate_score_card(self, country_name: str, all_evidence: list) -> dict:
-        print("  -> Beginning AI scoring process (this may take 30-90 seconds)...")
-        prompt = f"""
-        You are an IQSF Index Analyst. Generate the official, multi-axis Global Queer Safety Index™ score card for **{country_name}**.
-        Your analysis MUST be intersectional. Review the provided evidence and assign separate scores for each identity axis (Gay/Lesbian, Transgender, etc.) within each dimension.
-        Your output MUST be a single, valid JSON object.
-        **VERIFIED EVIDENCE:**
-        {json.dumps(all_evidence, indent=2)}
-        **JSON OUTPUT STRUCTURE:**
-        {{ "country": "{country_name}", "overall_weighted_score": "[...]", "score_matrix": {{ "legal_protections": {{ "overall_score": "[...]", "justification": "...", "identity_scores": {{...}} }} }} }}
-        """
+    # Strict json_schema output needs a model with structured outputs support; gpt-4-turbo only has JSON mode.
+    model = "gpt-4o"
+
+    def _score_card_request(self, country_name: str, evidence_json: str, draft: dict = None, model: str = None) -> dict:
+        # Evidence before the instructions: the per-country text comes last, so a retry on the same model reuses the cached prefix.
+        if draft:
+            task = f"""**DRAFT SCORE CARD:**
+{to_json(draft)}
+
+Review the draft Global Queer Safety Index™ score card for **{country_name}** against the evidence above.
+Correct any score or justification the evidence does not support and fill in missing identity axes or dimensions.
+Return the finalized card with "country" set to "{country_name}".
+"""
+        else:
+            task = f"""Generate the official, multi-axis Global Queer Safety Index™ score card for **{country_name}**.
+Review the evidence above and assign separate scores for each identity axis within each dimension.
+Return the score card with "country" set to "{country_name}".
+"""
+        prompt = f"""**VERIFIED EVIDENCE:**
+{evidence_json}
+
+{task}"""
+        return dict(
+            model=model or self.model, messages=[{"role": "system", "content": SYSTEM_METHODOLOGY}, {"role": "user", "content": prompt}],
+            response_format=SCORE_CARD_FORMAT, **SCORE_SAMPLING
+        )
+
+    def _score_cards_request(self, reports: list) -> dict:
+        """One request finalizing several (country_name, evidence_json, draft) triples, answered as {"cards": [...]} in the same order."""
+        blocks = "\n".join(
+            f"### COUNTRY {i}: {country_name}\nEVIDENCE:\n{evidence_json}\n" + (f"DRAFT SCORE CARD:\n{to_json(draft)}\n" if draft else "")
+            for i, (country_name, evidence_json, draft) in enumerate(reports, 1)
+        )
+        prompt = f"""{blocks}
+Produce the official, multi-axis Global Queer Safety Index™ score card for each of the {len(reports)} countries above, using only that country's evidence.
+Where a draft is given, review it against the evidence, correct unsupported scores or justifications and fill in missing identity axes; otherwise score from the evidence.
+Return exactly one score card per country in "cards", in the same order as the evidence blocks, each with "country" set.
+"""
+        return dict(
+            model=self.model, messages=[{"role": "system", "content": SYSTEM_METHODOLOGY}, {"role": "user", "content": prompt}],
+            response_format=SCORE_CARDS_FORMAT, **dict(SCORE_SAMPLING, max_tokens=min(SCORE_GROUP_MAX_TOKENS, SCORE_SAMPLING['max_tokens'] * len(reports)))
+        )
+
+    @staticmethod
+    def _valid_score_card(score_card, country_name: str) -> bool:
+        # A score of 0 is a valid card; bool is excluded because it is an int subclass.
+        score = score_card.get('overall_weighted_score') if isinstance(score_card, dict) else None
+        return (isinstance(score, (int, float)) and not isinstance(score, bool) and isinstance(score_card.get('score_matrix'), dict)
+                and str(score_card.get('country', country_name)).casefold() == country_name.casefold())
+
+    def _score_card_key(self, report: dict) -> str:
+        """Identifies a score card by the evidence rows behind it, so re-scoring unchanged evidence is a hit even if its serialisation changes."""
+        return self._prompt_key({"model": self.model, "sys": SYSTEM_METHODOLOGY, "evidence_ids": sorted(report['evidence_ids']), "v": SCORE_CARD_PROMPT_VERSION})
+
+    @staticmethod
+    def _evidence_text(report: dict, brief: bool = False) -> str:
+        """The report's evidence as prompt-ready JSON text, exactly as `compact_evidence` built it in the database."""
+        # brief_json is null when it would repeat evidence_json, i.e. every item is already a summary.
+        return (report.get('brief_json') or report['evidence_json']) if brief else report['evidence_json']
+
+    async def _draft_score_card(self, report: dict) -> dict:
+        """First pass on DRAFT_MODEL over the full evidence; returns None when the draft is unusable."""
+        country_name = report['country_name']
         try:
-            response = self.openai.chat.completions.create(
-                model="gpt-4-turbo", messages=[{"role": "system", "content": "You are a Senior IQSF Index Analyst..."}, {"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
-            )
-            return json.loads(response.choices[0].message.content)
+            content = await self._acached_chat(stage='score_draft', **self._score_card_request(country_name, self._evidence_text(report), model=DRAFT_MODEL))
+            draft = orjson.loads(content)
+        except Exception as e:
+            print(f"  -> Error drafting score card for {country_name}: {e}")
+            return None
+        return draft if self._valid_score_card(draft, country_name) else None
+
+    async def _generate_score_card(self, report: dict, draft: dict = None) -> dict:
+        """Returns the score card, or None when the model's reply is unusable; transient OpenAI errors propagate."""
+        country_name = report['country_name']
+        key = self._score_card_key(report)
+        cached = await asyncio.to_thread(self._cache_get, key)
+        if cached is not None:
+            return orjson.loads(cached)
+
+        print(f"  -> Beginning AI scoring for {country_name} (this may take 30-90 seconds)...")
+        try:
+            draft = draft or await self._draft_score_card(report)
+            # A good draft already reflects the full evidence, so the review pass only needs the trimmed form.
+            request = self._score_card_request(country_name, self._evidence_text(report, brief=bool(draft)), draft)
+            response = await self._acomplete('score_final', **request)
+            content = response.choices[0].message.content
+            score_card = orjson.loads(content)
+            if response.choices[0].finish_reason == "stop":
+                await asyncio.to_thread(self._cache_set, key, content)
+            return score_card
+        except openai_transient_errors():
+            raise
         except Exception as e:
             print(f"  -> Error during AI scoring: {e}")
             return None
 
-    def run(self):
-        print("-> Searching for completed report to score...")
-        response = self.supabase.rpc('get_next_report_for_synthesis').execute()
-        report = response.data[0] if response.data else None
-        if not report:
+    async def _generate_score_cards(self, reports: list) -> list:
+        """Scores several reports loaded by `_with_evidence`: drafts each on DRAFT_MODEL, then finalizes them in one call.
+
+        Any country whose final card is missing or invalid is re-scored on its own; one whose retry hits a transient
+        OpenAI error gets that exception in place of its card.
+        """
+        keys = [self._score_card_key(report) for report in reports]
+        cached = await asyncio.gather(*(asyncio.to_thread(self._cache_get, key) for key in keys))
+        cards = [orjson.loads(content) if content is not None else None for content in cached]
+
+        pending = [i for i, card in enumerate(cards) if card is None]
+        drafts = [None] * len(reports)
+        if len(pending) > 1:
+            countries = [reports[i]['country_name'] for i in pending]
+            print(f"  -> Beginning AI scoring for {len(pending)} countries in one call: {', '.join(countries)}...")
+            for i, draft in zip(pending, await asyncio.gather(*(self._draft_score_card(reports[i]) for i in pending))):
+                drafts[i] = draft
+            try:
+                request = self._score_cards_request([(reports[i]['country_name'], self._evidence_text(reports[i], brief=bool(drafts[i])), drafts[i]) for i in pending])
+                content = await self._acached_chat(stage='score_final', **request)
+                for i, card in zip(pending, orjson.loads(content).get('cards') or []):
+                    if self._valid_score_card(card, reports[i]['country_name']):
+                        cards[i] = card
+                        # Stored under the per-country key too, so re-scoring one of these reports is a cache hit.
+                        await asyncio.to_thread(self._cache_set, keys[i], to_json(card))
+            except Exception as e:
+                print(f"  -> Error during grouped AI scoring, falling back to one call per country: {e}")
+
+        retries = [i for i, report in enumerate(reports) if not self._valid_score_card(cards[i], report['country_name'])]
+        singles = await asyncio.gather(*(self._generate_score_card(reports[i], drafts[i]) for i in retries), return_exceptions=True)
+        for i, card in zip(retries, singles):
+            if isinstance(card, Exception) and not isinstance(card, openai_transient_errors()):
+                raise card
+            cards[i] = card
+        return cards
+
+    @staticmethod
+    def _score_row(report_id: int, country_name: str, score_card: dict) -> dict:
+        # finalize_scoring adds the evidence snapshot itself, so the trimmed evidence never makes the round-trip back.
+        return {'report_id': report_id, 'country_name': country_name, 'final_score': score_card.get('overall_weighted_score'), 'score_data': score_card.get('score_matrix')}
+
+    def _submit_batch(self, limit: int):
+        response = self.supabase.rpc('get_next_reports_for_synthesis', {'limit_input': limit}).execute()
+        if not response.data:
             print("-> No reports ready for scoring.")
             return
 
-        report_id, country_name = report['id'], report['country_name']
-        print(f"-> Found report: ID {report_id}, Country: {country_name}")
-        
-        evidence_response = self.supabase.rpc('get_all_evidence_for_report', {'report_id_input': report_id}).execute()
-        evidence = evidence_response.data
-        if not evidence:
-            print(f"-> ERROR: No evidence found for report {report_id}. Marking as failed.")
-            self.supabase.table('reports').update({'status': 'SCORING_FAILED'}).eq('id', report_id).execute()
+        self._submit_report_batch('score', response.data, self._batch_requests)
+
+    def _batch_requests(self, reports: list) -> list:
+        """One single-pass score card request per report that has evidence."""
+        return [(report['id'], self._score_card_request(report['country_name'], self._evidence_text(report))) for report in self._with_evidence(reports)]
+
+    def _with_evidence(self, reports: list) -> list:
+        """Loads every report's evidence in one RPC, failing the reports that have none.
+
+        Returns the rest with their 'evidence_ids' and the prompt-ready 'evidence_json' and 'brief_json' texts, which are
+        forwarded to OpenAI as-is rather than decoded into Python and re-serialised.
+        """
+        bundles = self.supabase.rpc('get_reports_with_evidence', {'report_ids': [report['id'] for report in reports]}).execute().data or []
+        ready = [bundle for bundle in bundles if bundle.get('evidence_ids')]
+        if ready:
+            size = sum(len(bundle['evidence_json']) for bundle in ready) // 1024
+            print(f"-> Loaded {sum(len(bundle['evidence_ids']) for bundle in ready)} evidence items ({size} KB) for {len(ready)} report(s).")
+        empty_ids = [report['id'] for report in reports if report['id'] not in {bundle['id'] for bundle in ready}]
+        if empty_ids:
+            print(f"-> ERROR: No evidence found for report(s) {', '.join(map(str, empty_ids))}. Marking as failed.")
+            self.supabase.table('reports').update({'status': 'SCORING_FAILED'}).in_('id', empty_ids).execute()
+        return ready
+
+    def _finalize_scoring(self, rows: list) -> dict:
+        """Inserts the score cards and moves their reports to REVIEW in one transaction.
+
+        Returns each report's evidence snapshot (the narrative's evidence JSON, built by the database) by report id.
+        """
+        saved = self.supabase.rpc('finalize_scoring', {'scores': rows, 'top_k': NARRATIVE_TOP_K}).execute().data or []
+        print(f"-> SUCCESS: Report IDs {', '.join(str(row['report_id']) for row in rows)} are now in 'REVIEW' status.")
+        return {row['report_id']: row['evidence_snapshot'] for row in saved}
+
+    def ingest_batch(self, job: dict, results: dict):
+        """Saves the score cards returned by a completed scoring batch."""
+        reports = self.supabase.table('reports').select('id, country_name').in_('id', job['metadata']['report_ids']).execute().data
+        rows, failed_ids, retry_ids = [], [], []
+        for report in reports:
+            content = results.get(str(report['id']))
+            if content is None:
+                # An expired, cancelled or failed batch returns nothing for some reports; that is no fault of theirs.
+                retry_ids.append(report['id'])
+                continue
+            try:
+                score_card = orjson.loads(content)
+                if not self._valid_score_card(score_card, report['country_name']):
+                    raise ValueError("score card is missing required fields")
+                rows.append(self._score_row(report['id'], report['country_name'], score_card))
+            except Exception as e:
+                print(f"    -> Invalid score card for report {report['id']}: {e}")
+                failed_ids.append(report['id'])
+        if rows:
+            self._finalize_scoring(rows)
+        if failed_ids:
+            self.supabase.table('reports').update({'status': 'SCORING_FAILED'}).in_('id', failed_ids).execute()
+        self._release_reports(retry_ids)
+
+    async def _score_group(self, reports: list, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            cards = await self._generate_score_cards(reports)
+
+        scored = [(report, self._score_row(report['id'], report['country_name'], card)) for report, card in zip(reports, cards) if isinstance(card, dict)]
+        rows = [row for _, row in scored]
+        failed_ids = [report['id'] for report, card in zip(reports, cards) if not card]
+        # Rate limits and outages are not the report's fault: the evidence is already paid for, so retry it later.
+        retry_ids = [report['id'] for report, card in zip(reports, cards) if isinstance(card, Exception)]
+        snapshots = await asyncio.to_thread(self._finalize_scoring, rows) if rows else {}
+        if failed_ids:
+            await asyncio.to_thread(self.supabase.table('reports').update({'status': 'SCORING_FAILED'}).in_('id', failed_ids).execute)
+        if retry_ids:
+            await asyncio.to_thread(self._release_reports, retry_ids)
+        # The pipeline hands the saved row and its evidence snapshot straight to the narrative stage.
+        return [
+            {'id': report['id'], 'country_name': report['country_name'], 'score_card': dict(row, evidence_snapshot=snapshots.get(report['id']))}
+            for report, row in scored
+        ]
+
+    async def _score_reports(self, reports: list) -> list:
+        """Scores the reports in groups of SCORE_GROUP_MAX countries, with at most SCORE_CONCURRENCY groups in flight."""
+        try:
+            reports = await asyncio.to_thread(self._with_evidence, reports)
+        except Exception as e:
+            print(f"-> ERROR: Could not load evidence: {e}")
+            await asyncio.to_thread(self._release_reports, [report['id'] for report in reports])
+            return []
+        semaphore = asyncio.Semaphore(SCORE_CONCURRENCY)
+        groups = [reports[i:i + SCORE_GROUP_MAX] for i in range(0, len(reports), SCORE_GROUP_MAX)]
+        results = await asyncio.gather(*(self._score_group(group, semaphore) for group in groups), return_exceptions=True)
+        scored = []
+        for group, result in zip(groups, results):
+            if isinstance(result, Exception):
+                # An unexpected error (not a bad card) says nothing about the report, so it goes back in the queue.
+                print(f"-> ERROR: Scoring failed for report(s) {', '.join(str(report['id']) for report in group)}: {result}")
+                await asyncio.to_thread(self._release_reports, [report['id'] for report in group])
+            else:
+                scored.extend(result)
+        return scored
+
+    async def handle(self, reports: list) -> list:
+        """Pipeline entry point: scores the given reports and returns the ones that reached REVIEW."""
+        return await self._score_reports(reports)
+
+    def run(self, batch: bool = False, limit: int = SCORE_BATCH_SIZE):
+        if batch:
+            print(f"-> Submitting up to {limit} completed reports as one OpenAI batch.")
+            self._submit_batch(limit)
+            return
+
+        print(f"-> Searching for up to {limit} completed reports to score...")
+        reports = self.supabase.rpc('claim_next_k_reports_for_synthesis', {'k': limit}).execute().data
+        if not reports:
+            print("-> No reports ready for scoring.")
             return
-        
-        score_card = self._generate_score_card(country_name, evidence)
-        if score_card:
-            self.supabase.table('index_scores').insert({'report_id': report_id, 'country_name': country_name, 'final_score': score_card.get('overall_weighted_score'), 'score_data': score_card.get('score_matrix')}).execute()
-            self.supabase.table('reports').update({'status': 'REVIEW'}).eq('id', report_id).execute()
-            print(f"-> SUCCESS: Report ID {report_id} is now in 'REVIEW' status.")
-        else:
-            self.supabase.table('reports').update({'status': 'SCORING_FAILED'}).eq('id', report_id).execute()
+
+        print(f"-> Found {len(reports)} reports: {', '.join(report['country_name'] for report in reports)}")
+        asyncio.run(self._score_reports(reports))
 
 class NarrativeAgent(Agent):
     """Generates a final, human-readable narrative report."""
-    def _generate_narrative(self, country_name: str, score_card: dict, all_evidence: list) -> str:
-        print("  -> Beginning AI narrative generation (this may take 30-60 seconds)...")
-        prompt = f"""
-        You are an expert analyst and writer for the IQSF. Write a detailed, 2000-word narrative report for the IQSF Global Queer Safety Index™ on **{country_name}**.
-        Tell the story BEHIND the numbers, weaving evidence into a compelling narrative and paying special attention to intersectional differences.
-        **FINAL SCORE CARD:**
-        {json.dumps(score_card, indent=2)}
-        **RAW EVIDENCE:**
-        {json.dumps(all_evidence, indent=2)}
-        The output should be only the final article text in Markdown format.
-        """
+    @staticmethod
+    def _narrative_prompt(country_name: str, score_card_json: str, evidence_json: str) -> str:
+        return f"""**EVIDENCE:** ("top_evidence" holds the most relevant items in detail, "other_evidence" one-line summaries of the rest)
+{evidence_json}
+
+**FINAL SCORE CARD:**
+{score_card_json}
+
+Acting as the IQSF's expert analyst and writer, write a detailed, 2000-word narrative report for the IQSF Global Queer Safety Index™ on **{country_name}**.
+Tell the story BEHIND the numbers, weaving evidence into a compelling narrative and paying special attention to intersectional differences.
+Footnote each claim with the ids of the evidence items it rests on, e.g. [12].
+The output should be only the final article text in Markdown format.
+"""
+
+    async def _draft_narrative(self, country_name: str, score_card_json: str, evidence_json: str) -> str:
+        """Writes the full draft on DRAFT_MODEL, so the evidence is only ever read by the cheap model."""
+        try:
+            return await self._acached_chat(
+                stage='narrative_draft', model=DRAFT_MODEL, **NARRATIVE_SAMPLING,
+                messages=[{"role": "system", "content": SYSTEM_METHODOLOGY}, {"role": "user", "content": self._narrative_prompt(country_name, score_card_json, evidence_json)}]
+            )
+        except Exception as e:
+            print(f"  -> Error drafting narrative for {country_name}: {e}")
+            return None
+
+    async def _generate_narrative(self, country_name: str, score_card_json: str, evidence_json: str, on_flush=None, echo: bool = True) -> str:
+        print(f"  -> Beginning AI narrative generation for {country_name} (this may take 30-60 seconds)...")
+        draft = await self._draft_narrative(country_name, score_card_json, evidence_json)
+        if draft:
+            stage, prompt = 'narrative_polish', f"""**FINAL SCORE CARD:**
+{score_card_json}
+
+**DRAFT REPORT:**
+{draft}
+
+Acting as the IQSF's expert analyst and editor, polish the draft into the final, detailed 2000-word narrative report for the IQSF Global Queer Safety Index™ on **{country_name}**.
+Tighten the prose, make sure every figure and claim agrees with the score card, and keep the evidence footnotes and the attention to intersectional differences.
+The output should be only the final article text in Markdown format.
+"""
+        else:
+            stage, prompt = 'narrative', self._narrative_prompt(country_name, score_card_json, evidence_json)
         try:
-            response = self.openai.chat.completions.create(model="gpt-4-turbo", messages=[{"role": "system", "content": "You are an expert IQSF analyst..."}, {"role": "user", "content": prompt}])
-            return response.choices[0].message.content
+            return await self._stream_completion(
+                on_flush, echo, stage, model=self.model, messages=[{"role": "system", "content": SYSTEM_METHODOLOGY}, {"role": "user", "content": prompt}], **NARRATIVE_SAMPLING
+            )
         except Exception as e:
+            # Rate limits and outages go to the caller, which releases the report for a later run.
+            if isinstance(e, openai_transient_errors()):
+                raise
             print(f"  -> Error during AI narrative generation: {e}")
             return None
 
-    def run(self):
-        print("-> Searching for scored report to narrate...")
-        response = self.supabase.table('reports').select('id, country_name').eq('status', 'REVIEW').limit(1).single().execute()
-        report = response.data
-        if not report:
+    def _fail_narratives(self, report_ids: list):
+        """Marks reports NARRATIVE_FAILED, for failures a retry would only repeat (and pay for) again."""
+        if report_ids:
+            self.supabase.table('reports').update({'status': 'NARRATIVE_FAILED'}).in_('id', report_ids).execute()
+            print(f"-> Report(s) {', '.join(map(str, report_ids))} marked 'NARRATIVE_FAILED'.")
+
+    def _settle_failed(self, report_ids: list, error: Exception):
+        """Releases reports that hit a transient OpenAI error and fails the rest."""
+        if isinstance(error, openai_transient_errors()):
+            self._release_reports(report_ids)
+        else:
+            self._fail_narratives(report_ids)
+
+    def _save_narrative(self, report_id: int, text: str, partial: bool = False):
+        self.supabase.table('published_content').upsert({'report_id': report_id, 'final_article_text': text, 'is_partial': partial}, on_conflict='report_id').execute()
+
+    async def _narrate_report(self, report: dict, semaphore: asyncio.Semaphore, echo: bool):
+        report_id, country_name = report['id'], report['country_name']
+        async with semaphore:
+            score_card = report.get('score_card')
+            if not (score_card and score_card.get('evidence_snapshot')):
+                # Cast to text, the snapshot goes into the prompt exactly as stored, without a decode/encode pass here.
+                rows = (await asyncio.to_thread(self.supabase.table('index_scores').select('report_id, country_name, final_score, score_data, evidence_snapshot::text').eq('report_id', report_id).limit(1).execute)).data
+                score_card = rows[0] if rows else None
+            if not score_card:
+                print(f"-> ERROR: Missing score card for report {report_id}.")
+                await asyncio.to_thread(self._fail_narratives, [report_id])
+                return
+
+            score_card = dict(score_card)
+            evidence_json = score_card.pop('evidence_snapshot', None)
+            if not evidence_json:
+                print(f"-> ERROR: Missing evidence for report {report_id}.")
+                await asyncio.to_thread(self._fail_narratives, [report_id])
+                return
+
+            # Partial text is upserted as it streams, so a failed run still leaves a resumable draft.
+            checkpoint = functools.partial(self._save_narrative, report_id, partial=True)
+            narrative = await self._generate_narrative(country_name, to_json(score_card), evidence_json, checkpoint, echo)
+
+        if narrative:
+            # The final text and the COMPLETE status land in one transaction.
+            await asyncio.to_thread(self.supabase.rpc('finalize_narrative', {'report_id_input': report_id, 'article_text': narrative}).execute)
+            print(f"-> SUCCESS: Report ID {report_id} is now 'COMPLETE'.")
+        else:
+            await asyncio.to_thread(self._fail_narratives, [report_id])
+
+    def _submit_batch(self, limit: int):
+        """Submits one single-pass narrative request per scored report (no draft or polish) as an OpenAI Batch API job."""
+        reports = self.supabase.rpc('get_next_reports_for_narrative', {'limit_input': limit}).execute().data
+        if not reports:
             print("-> No reports ready for narrative generation.")
             return
 
-        report_id, country_name = report['id'], report['country_name']
-        print(f"-> Found report to narrate: ID {report_id}, Country: {country_name}")
-        
-        evidence = self.supabase.rpc('get_all_evidence_for_report', {'report_id_input': report_id}).execute().data
-        score_card = self.supabase.table('index_scores').select('*').eq('report_id', report_id).single().execute().data
-        
-        if evidence and score_card:
-            narrative = self._generate_narrative(country_name, score_card, evidence)
+        self._submit_report_batch('narrate', reports, self._batch_requests)
+
+    def _batch_requests(self, reports: list) -> list:
+        return [(report['id'], dict(
+            model=self.model, **NARRATIVE_SAMPLING,
+            messages=[{"role": "system", "content": SYSTEM_METHODOLOGY}, {"role": "user", "content": self._narrative_prompt(report['country_name'], to_json(report['score_card']), report['evidence_json'])}]
+        )) for report in reports]
+
+    def ingest_batch(self, job: dict, results: dict):
+        """Publishes the narratives returned by a completed batch; reports without one go back to REVIEW for another run."""
+        reports = self.supabase.table('reports').select('id, country_name').in_('id', job['metadata']['report_ids']).execute().data
+        retry_ids = []
+        for report in reports:
+            narrative = results.get(str(report['id']))
             if narrative:
-                self.supabase.table('published_content').upsert({'report_id': report_id, 'final_article_text': narrative}, on_conflict='report_id').execute()
-                self.supabase.table('reports').update({'status': 'COMPLETE'}).eq('id', report_id).execute()
-                print(f"-> SUCCESS: Report ID {report_id} is now 'COMPLETE'.")
+                self.supabase.rpc('finalize_narrative', {'report_id_input': report['id'], 'article_text': narrative}).execute()
+                print(f"    -> Report ID {report['id']} is now 'COMPLETE'.")
+            else:
+                retry_ids.append(report['id'])
+        if retry_ids:
+            print(f"    -> No narrative for report(s) {', '.join(map(str, retry_ids))}; returned to 'REVIEW'.")
+            self.supabase.table('reports').update({'status': 'REVIEW'}).in_('id', retry_ids).execute()
+
+    async def _narrate_reports(self, reports: list):
+        """Streams the narratives in parallel, at most NARRATE_CONCURRENCY at a time; only a lone narrative is echoed."""
+        semaphore = asyncio.Semaphore(NARRATE_CONCURRENCY)
+        echo = len(reports) == 1
+        results = await asyncio.gather(*(self._narrate_report(report, semaphore, echo) for report in reports), return_exceptions=True)
+        for report, result in zip(reports, results):
+            if isinstance(result, Exception):
+                print(f"-> ERROR: Narrative failed for report {report['id']}: {result}")
+                await asyncio.to_thread(self._settle_failed, [report['id']], result)
+
+    def run(self, limit: int = 1, batch: bool = False):
+        if batch:
+            self._submit_batch(limit)
+            return
+
+        print("-> Searching for scored reports to narrate...")
+        reports = self.supabase.rpc('claim_next_k_reports_for_narrative', {'k': limit}).execute().data
+        if not reports:
+            print("-> No reports ready for narrative generation.")
+            return
+
+        print(f"-> Found {len(reports)} reports to narrate: {', '.join(report['country_name'] for report in reports)}")
+        asyncio.run(self._narrate_reports(reports))
+
+    async def handle(self, report: dict, semaphore: asyncio.Semaphore):
+        """Pipeline entry point: narrates one scored report without echoing the stream."""
+        await self._narrate_report(report, semaphore, echo=False)
 
 class CurriculumDeveloperAgent(Agent):
     """Transforms finished reports into educational course content."""
+    model = "gpt-4-turbo-preview"
+
     def _generate_course_blueprint(self, report_narrative: str, country_name: str) -> dict:
         print(f"  -> Generating course blueprint for {country_name}...")
         prompt = f"""
@@ -269,15 +1332,15 @@ class CurriculumDeveloperAgent(Agent):
         **Source Intelligence Report:** --- {report_narrative} ---
         """
         try:
-            response = self.openai.chat.completions.create(model="gpt-4-turbo-preview", messages=[{"role": "system", "content": "You are an Instructional Designer..."}, {"role": "user", "content": prompt}], response_format={"type": "json_object"})
-            return json.loads(response.choices[0].message.content)
+            content = self._cached_chat(model=self.model, messages=[{"role": "system", "content": "You are an Instructional Designer..."}, {"role": "user", "content": prompt}], response_format={"type": "json_object"})
+            return orjson.loads(content)
         except Exception as e:
             print(f"  -> Error generating course blueprint: {e}")
             return None
 
     def run(self, report_id: int):
         print(f"-> Starting curriculum development for Report ID: {report_id}")
-        response = self.supabase.table('published_content').select('final_article_text, reports(country_name)').eq('report_id', report_id).single().execute()
+        response = self.supabase.table('published_content').select('final_article_text, reports(country_name)').eq('report_id', report_id).eq('is_partial', False).single().execute()
         if not response.data:
             print(f"-> ERROR: No published content found for Report ID {report_id}.")
             return
@@ -288,65 +1351,187 @@ class CurriculumDeveloperAgent(Agent):
         
         if course_plan:
             print("\n--- COURSE BLUEPRINT GENERATED ---")
-            print(json.dumps(course_plan, indent=2))
+            print(to_json(course_plan, indent=True))
         else:
             print("-> FAILED: Could not generate course blueprint.")
 
 class AcademicReportAgent(Agent):
     """Transforms a standard narrative report into a formal, academic-style paper."""
-    def _generate_academic_paper(self, country_name: str, narrative_report: str, score_card: dict, evidence: list) -> str:
+    async def _generate_academic_paper(self, country_name: str, narrative_report: str, score_card: dict, evidence: list, on_flush=None) -> str:
         print("  -> Generating academic paper (this may take 60-120 seconds)...")
-        source_urls = list(set([s['url'] for item in evidence if 'sources' in item and item['sources'] for s in item['sources'] if 'url' in s]))
+        source_urls = sorted({s['url'] for item in evidence for s in item.get('sources') or () if s.get('url')})
         prompt = f"""
         You are a Ph.D.-level academic researcher. Transform the provided IQSF report on **{country_name}** into a formal academic paper.
         Structure it with: Abstract, Introduction, Literature Review, Methodology, Findings & Analysis (by pillar), Discussion, Conclusion, and Bibliography.
         **Source Narrative:** --- {narrative_report} ---
-        **Source Score Card:** --- {json.dumps(score_card, indent=2)} ---
-        **Bibliography URLs:** --- {json.dumps(source_urls, indent=2)} ---
+        **Source Score Card:** --- {to_json(score_card)} ---
+        **Bibliography URLs:** --- {to_json(source_urls)} ---
         """
         try:
-            response = self.openai.chat.completions.create(model="gpt-4-turbo", messages=[{"role": "system", "content": "You are a Ph.D.-level academic writer..."}, {"role": "user", "content": prompt}])
-            return response.choices[0].message.content
+            return await self._stream_completion(on_flush, model=self.model, messages=[{"role": "system", "content": "You are a Ph.D.-level academic writer..."}, {"role": "user", "content": prompt}])
         except Exception as e:
             print(f"    -> Error generating academic paper: {e}")
             return None
 
+    @staticmethod
+    def _paper_path(report_id: int, country_name: str) -> Path:
+        # Country names can contain spaces, slashes or accents; keep the filename portable.
+        safe_country = re.sub(r'[^A-Za-z0-9_-]', '_', country_name)
+        return Path(f"IQSF_Academic_Paper_Report_{report_id}_{safe_country}.md")
+
     def run(self, report_id: int):
         print(f"-> Starting academic paper generation for Report ID: {report_id}")
-        narrative_response = self.supabase.table('published_content').select('final_article_text, reports(country_name)').eq('report_id', report_id).single().execute()
-        score_card_response = self.supabase.table('index_scores').select('*').eq('report_id', report_id).single().execute()
-        evidence_response = self.supabase.rpc('get_all_evidence_for_report', {'report_id_input': report_id}).execute()
+        bundle = self.supabase.rpc('get_report_bundle', {'report_id_input': report_id}).execute().data or {}
 
-        if not (narrative_response.data and score_card_response.data and evidence_response.data):
+        if not (bundle.get('narrative') and bundle.get('score_card') and bundle.get('evidence')):
             print(f"-> ERROR: Could not retrieve all necessary data for Report ID {report_id}.")
             return
 
-        narrative, country_name = narrative_response.data['final_article_text'], narrative_response.data['reports']['country_name']
-        score_card, evidence = score_card_response.data, evidence_response.data
-        academic_paper = self._generate_academic_paper(country_name, narrative, score_card, evidence)
-        
+        narrative, country_name = bundle['narrative'], bundle['country_name']
+        score_card, evidence = bundle['score_card'], bundle['evidence']
+        path = self._paper_path(report_id, country_name)
+        checkpoint = functools.partial(path.write_text, encoding='utf-8')
+        academic_paper = asyncio.run(self._generate_academic_paper(country_name, narrative, score_card, evidence, checkpoint))
+
         if academic_paper:
-            filename = f"IQSF_Academic_Paper_Report_{report_id}_{country_name}.md"
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(academic_paper)
-            print(f"\n-> SUCCESS! Academic paper saved to: {filename}")
+            path.write_text(academic_paper, encoding='utf-8')
+            print(f"\n-> SUCCESS! Academic paper saved to: {path}")
         else:
             print("-> FAILED: Could not generate academic paper.")
 
+class BatchPollerAgent(Agent):
+    """Ingests the results of finished OpenAI Batch API jobs."""
+    def run(self):
+        print("-> Checking submitted batch jobs...")
+        jobs = self.supabase.table('batch_jobs').select('*').eq('status', 'SUBMITTED').execute().data
+        if not jobs:
+            print("-> No submitted batch jobs found.")
+            return
+
+        ingesters = {'plan': PlannerAgent, 'gather': GathererAgent, 'score': ScoringAgent, 'narrate': NarrativeAgent}
+        submitter = BatchSubmitter(self.supabase, self.openai)
+        for job in jobs:
+            status, results = submitter.fetch_results(job['batch_id'])
+            if results is None:
+                print(f"  -> Batch {job['batch_id']} ({job['kind']}) is still '{status}'.")
+                continue
+
+            print(f"  -> Batch {job['batch_id']} ({job['kind']}) finished as '{status}' with {len(results)} results.")
+            ingesters[job['kind']](use_cache=self.use_cache).ingest_batch(job, results)
+            self.supabase.table('batch_jobs').update({'status': status.upper()}).eq('id', job['id']).execute()
+
+class OrchestratorAgent(Agent):
+    """Runs gathering, scoring and narration as one long-lived pipeline, handing reports between stages in memory."""
+    def __init__(self, model: str = None, use_cache: bool = True):
+        super().__init__(model, use_cache)
+        # The orchestrator makes no calls of its own; an explicit --model is meant for every stage, else each keeps its default.
+        self.stage_model = model
+
+    async def _gather_stage(self, gatherer: GathererAgent, workers: int, research_done: asyncio.Event):
+        # With a direct DSN the gatherer sleeps on LISTEN/NOTIFY; without one it drains and is re-run on a timer.
+        while True:
+            try:
+                await gatherer._gather(workers, follow=bool(self.db_url), on_saved=research_done.set)
+            except Exception as e:
+                print(f"-> Gather stage error: {e}")
+            await asyncio.sleep(PIPELINE_POLL_SECONDS)
+
+    async def _score_stage(self, scorer: ScoringAgent, research_done: asyncio.Event, scored: asyncio.Queue):
+        while True:
+            try:
+                reports = (await asyncio.to_thread(self.supabase.rpc('claim_next_k_reports_for_synthesis', {'k': SCORE_BATCH_SIZE}).execute)).data
+                if reports:
+                    print(f"-> Scoring {len(reports)} reports: {', '.join(report['country_name'] for report in reports)}")
+                    for report in await scorer.handle(reports):
+                        scored.put_nowait(report)
+            except Exception as e:
+                print(f"-> Score stage error: {e}")
+            # Freshly saved answers may complete a report; otherwise re-check now and then for work from other processes.
+            try:
+                await asyncio.wait_for(research_done.wait(), PIPELINE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            research_done.clear()
+
+    async def _narrate_stage(self, narrator: NarrativeAgent, scored: asyncio.Queue):
+        semaphore = asyncio.Semaphore(NARRATE_CONCURRENCY)
+        in_flight, tasks = set(), set()
+
+        async def narrate(report: dict):
+            try:
+                await narrator.handle(report, semaphore)
+            except Exception as e:
+                print(f"-> Narrate stage error on report {report['id']}: {e}")
+                await asyncio.to_thread(narrator._settle_failed, [report['id']], e)
+            finally:
+                in_flight.discard(report['id'])
+
+        while True:
+            try:
+                handoff = [await asyncio.wait_for(scored.get(), PIPELINE_POLL_SECONDS)]
+                while not scored.empty():
+                    handoff.append(scored.get_nowait())
+            except asyncio.TimeoutError:
+                handoff = []
+            # Claim through the database even for handed-off reports, so a separate `narrate` process cannot double up.
+            # Without a handoff, sweep up to our spare capacity, e.g. reports from a scoring batch ingested with 'poll'.
+            capacity = len(handoff) or NARRATE_CONCURRENCY - len(in_flight)
+            if capacity <= 0:
+                continue
+            params = {'k': capacity, 'report_ids': [report['id'] for report in handoff] or None}
+            try:
+                claimed = (await asyncio.to_thread(self.supabase.rpc('claim_next_k_reports_for_narrative', params).execute)).data or []
+            except Exception as e:
+                print(f"-> Narrate stage error: {e}")
+                continue
+            handed = {report['id']: report for report in handoff}
+            for report in claimed:
+                in_flight.add(report['id'])
+                task = asyncio.create_task(narrate(handed.get(report['id'], report)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+    async def _pipeline(self, workers: int):
+        # Sub-agents share this process's clients, so creating them costs no new connections.
+        gatherer, scorer, narrator = (AgentClass(model=self.stage_model, use_cache=self.use_cache) for AgentClass in (GathererAgent, ScoringAgent, NarrativeAgent))
+        research_done, scored = asyncio.Event(), asyncio.Queue()
+        await asyncio.gather(
+            self._gather_stage(gatherer, workers, research_done),
+            self._score_stage(scorer, research_done, scored),
+            self._narrate_stage(narrator, scored),
+        )
+
+    def run(self, workers: int = GATHER_WORKERS):
+        print(f"-> Starting the gather -> score -> narrate pipeline with {workers} gatherer workers. Press Ctrl+C to stop.")
+        asyncio.run(self._pipeline(workers))
+
 # ==============================================================================
 # --- 3. MAIN COMMAND-LINE INTERFACE ---
 # ==============================================================================
 def main():
     """Parses command-line arguments and runs the appropriate agent."""
     parser = argparse.ArgumentParser(description="Master Controller for the IQSF Intelligence Factory.")
+    parser.add_argument('--model', type=str, default=None, help="Override the agent's default OpenAI model.")
+    parser.add_argument('--no-cache', action='store_true', help='Ignore cached responses and call OpenAI again (fresh responses are still cached).')
     subparsers = parser.add_subparsers(dest='agent', required=True, help='The agent to run.')
 
     plan_parser = subparsers.add_parser('plan', help='Run the Planner Agent.')
     plan_parser.add_argument('-c', '--country', type=str, required=True, help='The country to research.')
-    
-    subparsers.add_parser('gather', help='Run the Gatherer Agent continuously.')
-    subparsers.add_parser('score', help='Run the Scoring Agent on a completed report.')
-    subparsers.add_parser('narrate', help='Generate the final narrative for a scored report.')
+    plan_parser.add_argument('--batch', action='store_true', help='Submit through the OpenAI Batch API instead of calling it live.')
+
+    gather_parser = subparsers.add_parser('gather', help='Run the Gatherer Agent continuously.')
+    gather_parser.add_argument('-w', '--workers', type=int, default=GATHER_WORKERS, help='Number of concurrent research workers.')
+    gather_parser.add_argument('--batch', action='store_true', help='Drain all pending questions into one OpenAI Batch API job.')
+    gather_parser.add_argument('--follow', action='store_true', help='Keep running and wake on new questions via LISTEN/NOTIFY (needs a session-mode SUPABASE_DB_URL).')
+    score_parser = subparsers.add_parser('score', help='Run the Scoring Agent on a completed report.')
+    score_parser.add_argument('--batch', '--async', action='store_true', help="Submit several completed reports as one OpenAI Batch API job and exit; 'poll' saves the cards.")
+    score_parser.add_argument('-n', '--limit', type=int, default=SCORE_BATCH_SIZE, help='Maximum number of reports to score in one run.')
+    narrate_parser = subparsers.add_parser('narrate', help='Generate the final narrative for a scored report.')
+    narrate_parser.add_argument('-n', '--limit', type=int, default=1, help='Number of scored reports to narrate in parallel (or to submit, with --batch).')
+    narrate_parser.add_argument('--batch', '--async', action='store_true', help="Submit the narratives as one OpenAI Batch API job and exit; 'poll' publishes them.")
+    subparsers.add_parser('poll', aliases=['batch-poll'], help='Ingest the results of finished OpenAI batch jobs.')
+    run_parser = subparsers.add_parser('run', help='Run gathering, scoring and narration continuously in one process.')
+    run_parser.add_argument('-w', '--workers', type=int, default=GATHER_WORKERS, help='Number of concurrent research workers.')
     
     curriculum_parser = subparsers.add_parser('curriculum', help='Run the Curriculum Developer Agent.')
     curriculum_parser.add_argument('-r', '--report_id', type=int, required=True, help='The ID of the report to transform.')
@@ -354,21 +1539,25 @@ def main():
     academic_parser = subparsers.add_parser('academic', help='Run the Academic Report Agent.')
     academic_parser.add_argument('-r', '--report_id', type=int, required=True, help='The ID of the report to transform.')
 
+    parser.set_defaults(country=None, report_id=None, workers=GATHER_WORKERS, batch=False, follow=False, limit=SCORE_BATCH_SIZE)
     args = parser.parse_args()
 
     # Agent Factory
     agent_map = {
-        'plan': (PlannerAgent, {'country': args.country}),
-        'gather': (GathererAgent, {}),
-        'score': (ScoringAgent, {}),
-        'narrate': (NarrativeAgent, {}),
+        'plan': (PlannerAgent, {'country': args.country, 'batch': args.batch}),
+        'gather': (GathererAgent, {'workers': args.workers, 'batch': args.batch, 'follow': args.follow}),
+        'score': (ScoringAgent, {'batch': args.batch, 'limit': args.limit}),
+        'narrate': (NarrativeAgent, {'limit': args.limit, 'batch': args.batch}),
         'curriculum': (CurriculumDeveloperAgent, {'report_id': args.report_id}),
         'academic': (AcademicReportAgent, {'report_id': args.report_id}),
+        'poll': (BatchPollerAgent, {}),
+        'batch-poll': (BatchPollerAgent, {}),
+        'run': (OrchestratorAgent, {'workers': args.workers}),
     }
 
     if args.agent in agent_map:
         AgentClass, kwargs = agent_map[args.agent]
-        agent = AgentClass()
+        agent = AgentClass(model=args.model, use_cache=not args.no_cache)
         agent.run(**kwargs)
     else:
         print(f"Error: Unknown agent '{args.agent}'")
@@ -0,0 +1,18 @@
+-- Claims a batch of pending research questions for the Gatherer worker pool.
+-- SKIP LOCKED lets several gatherer processes claim work without colliding.
+create or replace function get_next_unanswered_questions(limit_input int)
+returns setof research_questions
+language sql
+as $$
+    update research_questions
+    set status = 'IN_PROGRESS'
+    where id in (
+        select id
+        from research_questions
+        where status = 'PENDING'
+        order by id
+        limit limit_input
+        for update skip locked
+    )
+    returning *;
+$$;
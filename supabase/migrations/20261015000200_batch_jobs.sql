@@ -0,0 +1,11 @@
+-- OpenAI Batch API jobs submitted by the agents and reconciled by `poll`.
+create table if not exists batch_jobs (
+    id bigint generated by default as identity primary key,
+    batch_id text not null unique,
+    kind text not null,
+    status text not null default 'SUBMITTED',
+    metadata jsonb not null default '{}'::jsonb,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists batch_jobs_status_idx on batch_jobs (status);
@@ -0,0 +1,20 @@
+-- Saves a batch of gatherer results in one transaction: bulk evidence insert plus status update.
+create or replace function complete_questions(ids jsonb, evidence jsonb)
+returns int
+language plpgsql
+as $$
+declare
+    saved int;
+begin
+    insert into evidence_items (question_id, answer_summary, key_findings, sources)
+    select e.question_id, e.answer_summary, e.key_findings, e.sources
+    from jsonb_to_recordset(evidence) as e(question_id bigint, answer_summary text, key_findings jsonb, sources jsonb);
+    get diagnostics saved = row_count;
+
+    update research_questions
+    set status = 'COMPLETE'
+    where id = any (select jsonb_array_elements_text(ids)::bigint);
+
+    return saved;
+end;
+$$;
@@ -0,0 +1,2 @@
+-- Streamed narratives are checkpointed while they generate; the flag clears once the article is complete.
+alter table published_content add column if not exists is_partial boolean not null default false;
@@ -0,0 +1,26 @@
+-- Semantic cache of planner responses, keyed by the embedding of the country-neutral prompt.
+create extension if not exists vector;
+
+create table if not exists llm_cache (
+    id bigint generated by default as identity primary key,
+    scope text not null,
+    embedding vector(1536) not null,
+    response jsonb not null,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists llm_cache_embedding_idx on llm_cache using ivfflat (embedding vector_cosine_ops);
+
+-- Returns the nearest cached response within the same scope (methodology dimension), if close enough.
+create or replace function match_llm_cache(scope_input text, query_embedding vector(1536), max_distance float)
+returns jsonb
+language sql
+stable
+as $$
+    select response
+    from llm_cache
+    where scope = scope_input
+      and embedding <=> query_embedding < max_distance
+    order by embedding <=> query_embedding
+    limit 1;
+$$;
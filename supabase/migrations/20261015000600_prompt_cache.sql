@@ -0,0 +1,6 @@
+-- Exact-match memoisation of chat completions, keyed by the SHA-256 of the canonicalised request.
+create table if not exists prompt_cache (
+    key text primary key,
+    response text not null,
+    created_at timestamptz not null default now()
+);
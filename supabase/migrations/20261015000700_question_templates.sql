@@ -0,0 +1,31 @@
+-- Country-neutral form of each research question, so identical questions across countries can be answered together.
+alter table research_questions add column if not exists question_template text;
+
+-- Unique per report (rather than per pillar) so the same template can still be planned for every country.
+create unique index if not exists research_questions_report_template_idx on research_questions (report_id, question_template);
+create index if not exists research_questions_template_idx on research_questions (question_template) where status = 'PENDING';
+
+-- Claims now carry the country and are ordered by template so shared templates land in the same batch.
+drop function if exists get_next_unanswered_questions(int);
+create function get_next_unanswered_questions(limit_input int)
+returns table (id bigint, report_id bigint, question text, question_template text, country_name text)
+language sql
+as $$
+    with claimed as (
+        update research_questions rq
+        set status = 'IN_PROGRESS'
+        where rq.id in (
+            select q.id
+            from research_questions q
+            where q.status = 'PENDING'
+            order by q.question_template, q.id
+            limit limit_input
+            for update skip locked
+        )
+        returning rq.id, rq.report_id, rq.question, rq.question_template
+    )
+    select c.id::bigint, c.report_id::bigint, c.question, c.question_template, r.country_name
+    from claimed c
+    join reports r on r.id = c.report_id
+    order by c.question_template, c.id;
+$$;
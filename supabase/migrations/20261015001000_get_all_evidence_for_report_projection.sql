@@ -0,0 +1,25 @@
+-- Projects only the columns the scoring/narrative prompts use, de-duplicates each item's sources
+-- and caps quotes at 500 characters, so less JSON crosses the wire and into GPT-4.
+drop function if exists get_all_evidence_for_report(int);
+create function get_all_evidence_for_report(report_id_input int)
+returns table (id bigint, question text, answer_summary text, key_findings jsonb, sources jsonb, model text)
+language sql
+stable
+as $$
+    select
+        e.id::bigint,
+        q.question,
+        e.answer_summary,
+        e.key_findings,
+        (
+            select coalesce(jsonb_agg(distinct
+                case when s ? 'quote' then jsonb_set(s, '{quote}', to_jsonb(left(s ->> 'quote', 500))) else s end
+            ), '[]'::jsonb)
+            from jsonb_array_elements(coalesce(e.sources, '[]'::jsonb)) as s
+        ) as sources,
+        e.model
+    from evidence_items e
+    join research_questions q on q.id = e.question_id
+    where q.report_id = report_id_input
+    order by e.id;
+$$;
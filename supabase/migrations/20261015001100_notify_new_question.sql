@@ -0,0 +1,15 @@
+-- Wakes `gather --follow` workers as soon as the planner inserts new questions.
+create or replace function notify_new_question()
+returns trigger
+language plpgsql
+as $$
+begin
+    perform pg_notify('new_question', new.id::text);
+    return new;
+end;
+$$;
+
+drop trigger if exists research_questions_notify on research_questions;
+create trigger research_questions_notify
+after insert on research_questions
+for each row execute function notify_new_question();
@@ -0,0 +1,28 @@
+-- Scoring through the OpenAI Batch API: reports remember the batch that is scoring them.
+alter table reports add column if not exists batch_id text;
+
+create index if not exists reports_batch_id_idx on reports (batch_id) where batch_id is not null;
+
+-- Claims up to limit_input reports whose research questions have all been answered.
+-- Claimed reports move to SCORING_SUBMITTED, so SKIP LOCKED keeps concurrent submitters apart.
+create or replace function get_next_reports_for_synthesis(limit_input int)
+returns table (id int, country_name text)
+language sql
+as $$
+    update reports r
+    set status = 'SCORING_SUBMITTED'
+    where r.id in (
+        select c.id
+        from reports c
+        where c.status not in ('SCORING_SUBMITTED', 'REVIEW', 'COMPLETE', 'SCORING_FAILED', 'PLAN_FAILED')
+          and exists (select 1 from research_questions q where q.report_id = c.id)
+          and not exists (
+              select 1 from research_questions q
+              where q.report_id = c.id and q.status in ('PENDING', 'IN_PROGRESS')
+          )
+        order by c.id
+        limit limit_input
+        for update skip locked
+    )
+    returning r.id, r.country_name;
+$$;
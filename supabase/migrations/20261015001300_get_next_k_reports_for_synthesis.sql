@@ -0,0 +1,18 @@
+-- Up to k reports whose research questions have all been answered, for concurrent live scoring.
+-- Read-only, like get_next_report_for_synthesis: the report leaves the pool when it is scored.
+create or replace function get_next_k_reports_for_synthesis(k int)
+returns table (id int, country_name text)
+language sql
+stable
+as $$
+    select r.id, r.country_name
+    from reports r
+    where r.status not in ('SCORING_SUBMITTED', 'REVIEW', 'COMPLETE', 'SCORING_FAILED', 'PLAN_FAILED')
+      and exists (select 1 from research_questions q where q.report_id = r.id)
+      and not exists (
+          select 1 from research_questions q
+          where q.report_id = r.id and q.status in ('PENDING', 'IN_PROGRESS')
+      )
+    order by r.id
+    limit k;
+$$;
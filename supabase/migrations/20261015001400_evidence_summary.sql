@@ -0,0 +1,48 @@
+-- A short, question-agnostic digest of each evidence item, written by the gatherer in the same call.
+-- Scoring and narrative prompts use it in place of the full findings and quotes.
+alter table evidence_items add column if not exists summary text;
+
+create or replace function complete_questions(ids jsonb, evidence jsonb)
+returns int
+language plpgsql
+as $$
+declare
+    saved int;
+begin
+    insert into evidence_items (question_id, answer_summary, key_findings, sources, model, summary)
+    select e.question_id, e.answer_summary, e.key_findings, e.sources, e.model, e.summary
+    from jsonb_to_recordset(evidence) as e(question_id bigint, answer_summary text, key_findings jsonb, sources jsonb, model text, summary text);
+    get diagnostics saved = row_count;
+
+    update research_questions
+    set status = 'COMPLETE'
+    where id = any (select jsonb_array_elements_text(ids)::bigint);
+
+    return saved;
+end;
+$$;
+
+drop function if exists get_all_evidence_for_report(int);
+create function get_all_evidence_for_report(report_id_input int)
+returns table (id bigint, question text, answer_summary text, key_findings jsonb, sources jsonb, model text, summary text)
+language sql
+stable
+as $$
+    select
+        e.id::bigint,
+        q.question,
+        e.answer_summary,
+        e.key_findings,
+        (
+            select coalesce(jsonb_agg(distinct
+                case when s ? 'quote' then jsonb_set(s, '{quote}', to_jsonb(left(s ->> 'quote', 500))) else s end
+            ), '[]'::jsonb)
+            from jsonb_array_elements(coalesce(e.sources, '[]'::jsonb)) as s
+        ) as sources,
+        e.model,
+        e.summary
+    from evidence_items e
+    join research_questions q on q.id = e.question_id
+    where q.report_id = report_id_input
+    order by e.id;
+$$;
@@ -0,0 +1,53 @@
+-- Every listed report with its evidence, in one round-trip for the scoring agent.
+create or replace function get_reports_with_evidence(report_ids int[])
+returns jsonb
+language sql
+stable
+as $$
+    select coalesce(jsonb_agg(jsonb_build_object(
+        'id', r.id,
+        'country_name', r.country_name,
+        'evidence', coalesce((select jsonb_agg(to_jsonb(e)) from get_all_evidence_for_report(r.id) e), '[]'::jsonb)
+    ) order by r.id), '[]'::jsonb)
+    from reports r
+    where r.id = any (report_ids);
+$$;
+
+-- Saves score cards and moves their reports to REVIEW atomically.
+-- Any earlier card for the same report is replaced, so re-scoring is idempotent.
+create or replace function finalize_scoring(scores jsonb)
+returns int
+language plpgsql
+as $$
+declare
+    saved int;
+begin
+    delete from index_scores
+    where report_id in (select (s ->> 'report_id')::int from jsonb_array_elements(scores) as s);
+
+    insert into index_scores (report_id, country_name, final_score, score_data)
+    select s.report_id, s.country_name, s.final_score, s.score_data
+    -- populate_recordset takes the column types from index_scores itself.
+    from jsonb_populate_recordset(null::index_scores, scores) as s;
+    get diagnostics saved = row_count;
+
+    update reports
+    set status = 'REVIEW'
+    where id in (select (s ->> 'report_id')::int from jsonb_array_elements(scores) as s);
+
+    return saved;
+end;
+$$;
+
+-- Publishes the final narrative and completes the report atomically.
+create or replace function finalize_narrative(report_id_input int, article_text text)
+returns void
+language sql
+as $$
+    insert into published_content (report_id, final_article_text, is_partial)
+    values (report_id_input, article_text, false)
+    on conflict (report_id) do update
+    set final_article_text = excluded.final_article_text, is_partial = false;
+
+    update reports set status = 'COMPLETE' where id = report_id_input;
+$$;
@@ -0,0 +1,13 @@
+-- Token usage per OpenAI call, tagged with the agent and pipeline stage (e.g. score_draft, score_final).
+create table if not exists llm_usage (
+    id bigint generated by default as identity primary key,
+    agent text not null,
+    stage text,
+    model text,
+    prompt_tokens int,
+    completion_tokens int,
+    cached_tokens int not null default 0,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists llm_usage_created_at_idx on llm_usage (created_at);
@@ -0,0 +1,42 @@
+-- The trimmed evidence a score card was produced from, so the narrative reads one row instead of every evidence item.
+alter table index_scores add column if not exists evidence_snapshot jsonb;
+
+create or replace function finalize_scoring(scores jsonb)
+returns int
+language plpgsql
+as $$
+declare
+    saved int;
+begin
+    delete from index_scores
+    where report_id in (select (s ->> 'report_id')::int from jsonb_array_elements(scores) as s);
+
+    insert into index_scores (report_id, country_name, final_score, score_data, evidence_snapshot)
+    select s.report_id, s.country_name, s.final_score, s.score_data, s.evidence_snapshot
+    -- populate_recordset takes the column types from index_scores itself.
+    from jsonb_populate_recordset(null::index_scores, scores) as s;
+    get diagnostics saved = row_count;
+
+    update reports
+    set status = 'REVIEW'
+    where id in (select (s ->> 'report_id')::int from jsonb_array_elements(scores) as s);
+
+    return saved;
+end;
+$$;
+
+-- The bundle's score card no longer needs to carry the snapshot; the academic agent reads the full evidence.
+create or replace function get_report_bundle(report_id_input int)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'country_name', r.country_name,
+        'narrative', (select pc.final_article_text from published_content pc where pc.report_id = r.id),
+        'score_card', (select to_jsonb(s) - 'evidence_snapshot' from index_scores s where s.report_id = r.id limit 1),
+        'evidence', coalesce((select jsonb_agg(to_jsonb(e)) from get_all_evidence_for_report(r.id) e), '[]'::jsonb)
+    )
+    from reports r
+    where r.id = report_id_input;
+$$;
@@ -0,0 +1,87 @@
+-- Claims for the scoring and narrative stages, so parallel workers never pick up the same report.
+-- A claim remembers the status it replaced, so a failed worker can hand the report back unchanged;
+-- claims older than an hour are treated as abandoned (e.g. the worker was killed) and can be re-claimed.
+alter table reports add column if not exists claimed_from_status text;
+alter table reports add column if not exists claimed_at timestamptz;
+
+create or replace function claim_next_k_reports_for_synthesis(k int)
+returns table (id int, country_name text)
+language sql
+as $$
+    update reports r
+    set status = 'SCORING_IN_PROGRESS',
+        claimed_from_status = case when r.status = 'SCORING_IN_PROGRESS' then r.claimed_from_status else r.status end,
+        claimed_at = now()
+    where r.id in (
+        select c.id
+        from reports c
+        where (
+            c.status not in ('SCORING_IN_PROGRESS', 'SCORING_SUBMITTED', 'REVIEW', 'NARRATIVE_IN_PROGRESS', 'COMPLETE', 'SCORING_FAILED', 'PLAN_FAILED')
+            or (c.status = 'SCORING_IN_PROGRESS' and c.claimed_at < now() - interval '1 hour')
+        )
+          and exists (select 1 from research_questions q where q.report_id = c.id)
+          and not exists (
+              select 1 from research_questions q
+              where q.report_id = c.id and q.status in ('PENDING', 'IN_PROGRESS')
+          )
+        order by c.id
+        limit k
+        for update skip locked
+    )
+    returning r.id, r.country_name;
+$$;
+
+-- report_ids narrows the claim to specific reports (the pipeline's in-memory handoff); null claims any.
+create or replace function claim_next_k_reports_for_narrative(k int, report_ids int[] default null)
+returns table (id int, country_name text)
+language sql
+as $$
+    update reports r
+    set status = 'NARRATIVE_IN_PROGRESS', claimed_from_status = 'REVIEW', claimed_at = now()
+    where r.id in (
+        select c.id
+        from reports c
+        where (c.status = 'REVIEW' or (c.status = 'NARRATIVE_IN_PROGRESS' and c.claimed_at < now() - interval '1 hour'))
+          and (report_ids is null or c.id = any (report_ids))
+        order by c.id
+        limit k
+        for update skip locked
+    )
+    returning r.id, r.country_name;
+$$;
+
+-- Hands claimed reports back in the status they were claimed from.
+create or replace function release_reports(report_ids int[])
+returns void
+language sql
+as $$
+    update reports
+    set status = coalesce(claimed_from_status, status), claimed_from_status = null, claimed_at = null
+    where id = any (report_ids) and status in ('SCORING_IN_PROGRESS', 'NARRATIVE_IN_PROGRESS');
+$$;
+
+-- Superseded by the claiming version above.
+drop function if exists get_next_k_reports_for_synthesis(int);
+
+-- The batch claim must also skip reports a live worker holds.
+create or replace function get_next_reports_for_synthesis(limit_input int)
+returns table (id int, country_name text)
+language sql
+as $$
+    update reports r
+    set status = 'SCORING_SUBMITTED'
+    where r.id in (
+        select c.id
+        from reports c
+        where c.status not in ('SCORING_IN_PROGRESS', 'SCORING_SUBMITTED', 'REVIEW', 'NARRATIVE_IN_PROGRESS', 'COMPLETE', 'SCORING_FAILED', 'PLAN_FAILED')
+          and exists (select 1 from research_questions q where q.report_id = c.id)
+          and not exists (
+              select 1 from research_questions q
+              where q.report_id = c.id and q.status in ('PENDING', 'IN_PROGRESS')
+          )
+        order by c.id
+        limit limit_input
+        for update skip locked
+    )
+    returning r.id, r.country_name;
+$$;
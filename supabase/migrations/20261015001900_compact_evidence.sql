@@ -0,0 +1,109 @@
+-- The prompt form of a report's evidence, built where the rows live. The agents forward it as text instead of
+-- decoding every evidence row into Python and re-encoding it for each prompt.
+-- Each distinct source (by url, else title) is listed once under "sources" as S1, S2, ... in order of first
+-- appearance, without its quote, and cited by id from the items. Summarised items carry just their id, summary
+-- and source ids; otherwise, with brief, items keep only the question, answer summary, first three key findings
+-- and source ids, and without it every column plus the quotes.
+create or replace function compact_evidence(report_id_input int, brief boolean default false)
+returns jsonb
+language sql
+stable
+as $$
+    with items as (
+        select e.*, coalesce(e.summary, '') <> '' as summarised
+        from get_all_evidence_for_report(report_id_input) e
+    ),
+    cited as (
+        select i.id as item_id, s.ord, s.source, coalesce(s.source ->> 'url', s.source ->> 'title') as source_key
+        from items i, jsonb_array_elements(coalesce(i.sources, '[]'::jsonb)) with ordinality as s(source, ord)
+        where coalesce(s.source ->> 'url', s.source ->> 'title') is not null
+    ),
+    numbered as (
+        select source_key,
+               'S' || row_number() over (order by min(array[item_id, ord])) as ref,
+               (array_agg(source - 'quote' order by item_id, ord))[1] as source
+        from cited
+        group by source_key
+    )
+    select jsonb_build_object(
+        'sources', coalesce((select jsonb_object_agg(n.ref, n.source) from numbered n), '{}'::jsonb),
+        'evidence', coalesce((
+            select jsonb_agg(
+                case
+                    when i.summarised then jsonb_build_object('id', i.id, 'summary', i.summary)
+                    when brief then jsonb_build_object(
+                        'question', i.question,
+                        'answer_summary', i.answer_summary,
+                        'key_findings', coalesce((
+                            select jsonb_agg(f.finding order by f.ord)
+                            from jsonb_array_elements(coalesce(i.key_findings, '[]'::jsonb)) with ordinality as f(finding, ord)
+                            where f.ord <= 3
+                        ), '[]'::jsonb)
+                    )
+                    else to_jsonb(i) - 'sources' - 'summarised'
+                end
+                || jsonb_build_object('sources', coalesce((
+                    select jsonb_agg(
+                        case when brief or i.summarised or coalesce(c.source ->> 'quote', '') = '' then to_jsonb(n.ref)
+                             else jsonb_build_object('source', n.ref, 'quote', c.source -> 'quote') end
+                        order by c.ord
+                    )
+                    from cited c
+                    join numbered n on n.source_key = c.source_key
+                    where c.item_id = i.id
+                ), '[]'::jsonb))
+                order by i.id
+            )
+            from items i
+        ), '[]'::jsonb)
+    );
+$$;
+
+-- Each report's evidence ids plus its full and brief prompt texts. brief_json is null when it would equal
+-- evidence_json, which is the case once every item has a summary.
+create or replace function get_reports_with_evidence(report_ids int[])
+returns jsonb
+language sql
+stable
+as $$
+    select coalesce(jsonb_agg(jsonb_build_object(
+        'id', r.id,
+        'country_name', r.country_name,
+        'evidence_ids', jsonb_path_query_array(c.full_form, '$.evidence[*].id'),
+        'evidence_json', c.full_form::text,
+        'brief_json', nullif(c.brief_form::text, c.full_form::text)
+    ) order by r.id), '[]'::jsonb)
+    from reports r
+    cross join lateral (select compact_evidence(r.id) as full_form, compact_evidence(r.id, true) as brief_form) c
+    where r.id = any (report_ids);
+$$;
+
+-- The snapshot is now built here rather than sent back by the scorer, so batch-scored cards get one too.
+create or replace function finalize_scoring(scores jsonb)
+returns int
+language plpgsql
+as $$
+declare
+    saved int;
+begin
+    delete from index_scores
+    where report_id in (select (s ->> 'report_id')::int from jsonb_array_elements(scores) as s);
+
+    insert into index_scores (report_id, country_name, final_score, score_data, evidence_snapshot)
+    select s.report_id, s.country_name, s.final_score, s.score_data, compact_evidence(s.report_id, true)
+    -- populate_recordset takes the column types from index_scores itself.
+    from jsonb_populate_recordset(null::index_scores, scores) as s;
+    get diagnostics saved = row_count;
+
+    update reports
+    set status = 'REVIEW'
+    where id in (select (s ->> 'report_id')::int from jsonb_array_elements(scores) as s);
+
+    return saved;
+end;
+$$;
+
+-- Cards saved without a snapshot (before it existed, or through a batch) get one, so the narrative always has it.
+update index_scores
+set evidence_snapshot = compact_evidence(report_id, true)
+where evidence_snapshot is null;
@@ -0,0 +1,79 @@
+-- Narratives through the OpenAI Batch API. Submitted reports wait in NARRATIVE_SUBMITTED under reports.batch_id.
+
+-- Claims up to limit_input scored reports, returning each with its score card and evidence snapshot (as text, ready
+-- for the prompt), so the submitter needs no further reads.
+create or replace function get_next_reports_for_narrative(limit_input int)
+returns table (id int, country_name text, score_card jsonb, evidence_json text)
+language sql
+as $$
+    with claimed as (
+        update reports r
+        set status = 'NARRATIVE_SUBMITTED'
+        where r.id in (
+            select c.id
+            from reports c
+            where c.status = 'REVIEW'
+              and exists (select 1 from index_scores s where s.report_id = c.id)
+            order by c.id
+            limit limit_input
+            for update skip locked
+        )
+        returning r.id, r.country_name
+    )
+    select c.id, c.country_name,
+           jsonb_build_object('report_id', s.report_id, 'country_name', s.country_name, 'final_score', s.final_score, 'score_data', s.score_data),
+           s.evidence_snapshot::text
+    from claimed c
+    join lateral (select * from index_scores i where i.report_id = c.id limit 1) s on true
+    order by c.id;
+$$;
+
+-- Scoring must leave reports with a narrative batch in flight alone.
+create or replace function claim_next_k_reports_for_synthesis(k int)
+returns table (id int, country_name text)
+language sql
+as $$
+    update reports r
+    set status = 'SCORING_IN_PROGRESS',
+        claimed_from_status = case when r.status = 'SCORING_IN_PROGRESS' then r.claimed_from_status else r.status end,
+        claimed_at = now()
+    where r.id in (
+        select c.id
+        from reports c
+        where (
+            c.status not in ('SCORING_IN_PROGRESS', 'SCORING_SUBMITTED', 'REVIEW', 'NARRATIVE_IN_PROGRESS', 'NARRATIVE_SUBMITTED', 'COMPLETE', 'SCORING_FAILED', 'PLAN_FAILED')
+            or (c.status = 'SCORING_IN_PROGRESS' and c.claimed_at < now() - interval '1 hour')
+        )
+          and exists (select 1 from research_questions q where q.report_id = c.id)
+          and not exists (
+              select 1 from research_questions q
+              where q.report_id = c.id and q.status in ('PENDING', 'IN_PROGRESS')
+          )
+        order by c.id
+        limit k
+        for update skip locked
+    )
+    returning r.id, r.country_name;
+$$;
+
+create or replace function get_next_reports_for_synthesis(limit_input int)
+returns table (id int, country_name text)
+language sql
+as $$
+    update reports r
+    set status = 'SCORING_SUBMITTED'
+    where r.id in (
+        select c.id
+        from reports c
+        where c.status not in ('SCORING_IN_PROGRESS', 'SCORING_SUBMITTED', 'REVIEW', 'NARRATIVE_IN_PROGRESS', 'NARRATIVE_SUBMITTED', 'COMPLETE', 'SCORING_FAILED', 'PLAN_FAILED')
+          and exists (select 1 from research_questions q where q.report_id = c.id)
+          and not exists (
+              select 1 from research_questions q
+              where q.report_id = c.id and q.status in ('PENDING', 'IN_PROGRESS')
+          )
+        order by c.id
+        limit limit_input
+        for update skip locked
+    )
+    returning r.id, r.country_name;
+$$;
@@ -0,0 +1,113 @@
+-- How much an evidence item bears on the country's overall picture (0-1), rated by the gatherer in the same call.
+-- The narrative reads only the most relevant items in detail and the rest as one-line summaries.
+alter table evidence_items add column if not exists relevance_score real;
+
+create or replace function complete_questions(ids jsonb, evidence jsonb)
+returns int
+language plpgsql
+as $$
+declare
+    saved int;
+begin
+    insert into evidence_items (question_id, answer_summary, key_findings, sources, model, summary, relevance_score)
+    select e.question_id, e.answer_summary, e.key_findings, e.sources, e.model, e.summary, e.relevance_score
+    from jsonb_to_recordset(evidence) as e(question_id bigint, answer_summary text, key_findings jsonb, sources jsonb, model text, summary text, relevance_score real);
+    get diagnostics saved = row_count;
+
+    update research_questions
+    set status = 'COMPLETE'
+    where id = any (select jsonb_array_elements_text(ids)::bigint);
+
+    return saved;
+end;
+$$;
+
+-- The narrative's evidence: the top_k most relevant items (unrated ones last) with their question, answer, first
+-- three key findings and cited sources, then every other item as its id and one-line summary. Sources are listed
+-- once, as in compact_evidence, but only those the top items cite.
+create or replace function narrative_evidence(report_id_input int, top_k int)
+returns jsonb
+language sql
+stable
+as $$
+    with items as (
+        select e.id::bigint as id, q.question, e.answer_summary, e.key_findings, e.sources, e.summary,
+               row_number() over (order by e.relevance_score desc nulls last, e.id) as rank
+        from evidence_items e
+        join research_questions q on q.id = e.question_id
+        where q.report_id = report_id_input
+    ),
+    cited as (
+        select i.id as item_id, s.ord, s.source, coalesce(s.source ->> 'url', s.source ->> 'title') as source_key
+        from items i, jsonb_array_elements(coalesce(i.sources, '[]'::jsonb)) with ordinality as s(source, ord)
+        where i.rank <= top_k and coalesce(s.source ->> 'url', s.source ->> 'title') is not null
+    ),
+    numbered as (
+        select source_key,
+               'S' || row_number() over (order by min(array[item_id, ord])) as ref,
+               (array_agg(source - 'quote' order by item_id, ord))[1] as source
+        from cited
+        group by source_key
+    )
+    select jsonb_build_object(
+        'sources', coalesce((select jsonb_object_agg(n.ref, n.source) from numbered n), '{}'::jsonb),
+        'top_evidence', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                'id', i.id,
+                'question', i.question,
+                'answer_summary', i.answer_summary,
+                'key_findings', coalesce((
+                    select jsonb_agg(f.finding order by f.ord)
+                    from jsonb_array_elements(coalesce(i.key_findings, '[]'::jsonb)) with ordinality as f(finding, ord)
+                    where f.ord <= 3
+                ), '[]'::jsonb),
+                'sources', coalesce((
+                    select jsonb_agg(n.ref order by c.ord)
+                    from cited c
+                    join numbered n on n.source_key = c.source_key
+                    where c.item_id = i.id
+                ), '[]'::jsonb)
+            ) order by i.rank)
+            from items i
+            where i.rank <= top_k
+        ), '[]'::jsonb),
+        'other_evidence', coalesce((
+            select jsonb_agg(jsonb_build_object('id', i.id, 'summary', coalesce(nullif(i.summary, ''), i.answer_summary)) order by i.id)
+            from items i
+            where i.rank > top_k
+        ), '[]'::jsonb)
+    );
+$$;
+
+-- The snapshot is now the narrative's evidence, and the saved snapshots are returned so the in-process pipeline
+-- can hand them to the narrative stage without reading them back.
+drop function if exists finalize_scoring(jsonb);
+create function finalize_scoring(scores jsonb, top_k int default 15)
+returns table (report_id int, evidence_snapshot text)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+    delete from index_scores i
+    where i.report_id in (select (s ->> 'report_id')::int from jsonb_array_elements(scores) as s);
+
+    return query
+    with saved as (
+        insert into index_scores as i (report_id, country_name, final_score, score_data, evidence_snapshot)
+        select s.report_id, s.country_name, s.final_score, s.score_data, narrative_evidence(s.report_id, top_k)
+        -- populate_recordset takes the column types from index_scores itself.
+        from jsonb_populate_recordset(null::index_scores, scores) as s
+        returning i.report_id, i.evidence_snapshot
+    )
+    select saved.report_id::int, saved.evidence_snapshot::text from saved;
+
+    update reports r
+    set status = 'REVIEW'
+    where r.id in (select (s ->> 'report_id')::int from jsonb_array_elements(scores) as s);
+end;
+$$;
+
+-- Reports still waiting for a narrative switch to the new snapshot.
+update index_scores i
+set evidence_snapshot = narrative_evidence(i.report_id, 15)
+where i.report_id in (select r.id from reports r where r.status in ('REVIEW', 'NARRATIVE_IN_PROGRESS'));
@@ -0,0 +1,147 @@
+-- Crawls and re-fetches produce the same answer more than once (the same source again, mirrors, translations),
+-- and every copy was paid for in both the scoring and the narrative prompt. Prompts now read each report's
+-- evidence through distinct_evidence, which keeps one representative per group of duplicates.
+create extension if not exists pg_trgm;
+
+-- get_all_evidence_for_report plus relevance_score, without duplicates. Items are compared on their summary (or
+-- answer, when unsummarised), lower-cased with whitespace collapsed: exact copies collapse on an md5 of that text,
+-- and an item whose trigram similarity to a better one reaches min_similarity is dropped. The better item is the
+-- higher relevance_score, then the lower id, so each cluster keeps its highest-rated representative.
+create or replace function distinct_evidence(report_id_input int, min_similarity real default 0.85)
+returns table (id bigint, question text, answer_summary text, key_findings jsonb, sources jsonb, model text, summary text, relevance_score real)
+language sql
+stable
+as $$
+    with items as (
+        select e.*, i.relevance_score,
+               lower(regexp_replace(coalesce(nullif(e.summary, ''), e.answer_summary, ''), '\s+', ' ', 'g')) as normalized
+        from get_all_evidence_for_report(report_id_input) e
+        join evidence_items i on i.id = e.id
+    ),
+    unique_items as (
+        -- Items with no text to compare are never treated as copies of each other.
+        select distinct on (case when normalized = '' then 'id:' || id else md5(normalized) end) *
+        from items
+        order by case when normalized = '' then 'id:' || id else md5(normalized) end, relevance_score desc nulls last, id
+    )
+    select u.id, u.question, u.answer_summary, u.key_findings, u.sources, u.model, u.summary, u.relevance_score
+    from unique_items u
+    where u.normalized = '' or not exists (
+        select 1
+        from unique_items b
+        where b.id <> u.id
+          and b.normalized <> ''
+          and (coalesce(b.relevance_score, -1), -b.id) > (coalesce(u.relevance_score, -1), -u.id)
+          and similarity(b.normalized, u.normalized) >= min_similarity
+    )
+    order by u.id;
+$$;
+
+-- Unchanged apart from reading distinct_evidence (and leaving its relevance_score out of the full form).
+create or replace function compact_evidence(report_id_input int, brief boolean default false)
+returns jsonb
+language sql
+stable
+as $$
+    with items as (
+        select e.*, coalesce(e.summary, '') <> '' as summarised
+        from distinct_evidence(report_id_input) e
+    ),
+    cited as (
+        select i.id as item_id, s.ord, s.source, coalesce(s.source ->> 'url', s.source ->> 'title') as source_key
+        from items i, jsonb_array_elements(coalesce(i.sources, '[]'::jsonb)) with ordinality as s(source, ord)
+        where coalesce(s.source ->> 'url', s.source ->> 'title') is not null
+    ),
+    numbered as (
+        select source_key,
+               'S' || row_number() over (order by min(array[item_id, ord])) as ref,
+               (array_agg(source - 'quote' order by item_id, ord))[1] as source
+        from cited
+        group by source_key
+    )
+    select jsonb_build_object(
+        'sources', coalesce((select jsonb_object_agg(n.ref, n.source) from numbered n), '{}'::jsonb),
+        'evidence', coalesce((
+            select jsonb_agg(
+                case
+                    when i.summarised then jsonb_build_object('id', i.id, 'summary', i.summary)
+                    when brief then jsonb_build_object(
+                        'question', i.question,
+                        'answer_summary', i.answer_summary,
+                        'key_findings', coalesce((
+                            select jsonb_agg(f.finding order by f.ord)
+                            from jsonb_array_elements(coalesce(i.key_findings, '[]'::jsonb)) with ordinality as f(finding, ord)
+                            where f.ord <= 3
+                        ), '[]'::jsonb)
+                    )
+                    else to_jsonb(i) - 'sources' - 'summarised' - 'relevance_score'
+                end
+                || jsonb_build_object('sources', coalesce((
+                    select jsonb_agg(
+                        case when brief or i.summarised or coalesce(c.source ->> 'quote', '') = '' then to_jsonb(n.ref)
+                             else jsonb_build_object('source', n.ref, 'quote', c.source -> 'quote') end
+                        order by c.ord
+                    )
+                    from cited c
+                    join numbered n on n.source_key = c.source_key
+                    where c.item_id = i.id
+                ), '[]'::jsonb))
+                order by i.id
+            )
+            from items i
+        ), '[]'::jsonb)
+    );
+$$;
+
+-- Unchanged apart from reading distinct_evidence.
+create or replace function narrative_evidence(report_id_input int, top_k int)
+returns jsonb
+language sql
+stable
+as $$
+    with items as (
+        select e.id, e.question, e.answer_summary, e.key_findings, e.sources, e.summary,
+               row_number() over (order by e.relevance_score desc nulls last, e.id) as rank
+        from distinct_evidence(report_id_input) e
+    ),
+    cited as (
+        select i.id as item_id, s.ord, s.source, coalesce(s.source ->> 'url', s.source ->> 'title') as source_key
+        from items i, jsonb_array_elements(coalesce(i.sources, '[]'::jsonb)) with ordinality as s(source, ord)
+        where i.rank <= top_k and coalesce(s.source ->> 'url', s.source ->> 'title') is not null
+    ),
+    numbered as (
+        select source_key,
+               'S' || row_number() over (order by min(array[item_id, ord])) as ref,
+               (array_agg(source - 'quote' order by item_id, ord))[1] as source
+        from cited
+        group by source_key
+    )
+    select jsonb_build_object(
+        'sources', coalesce((select jsonb_object_agg(n.ref, n.source) from numbered n), '{}'::jsonb),
+        'top_evidence', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                'id', i.id,
+                'question', i.question,
+                'answer_summary', i.answer_summary,
+                'key_findings', coalesce((
+                    select jsonb_agg(f.finding order by f.ord)
+                    from jsonb_array_elements(coalesce(i.key_findings, '[]'::jsonb)) with ordinality as f(finding, ord)
+                    where f.ord <= 3
+                ), '[]'::jsonb),
+                'sources', coalesce((
+                    select jsonb_agg(n.ref order by c.ord)
+                    from cited c
+                    join numbered n on n.source_key = c.source_key
+                    where c.item_id = i.id
+                ), '[]'::jsonb)
+            ) order by i.rank)
+            from items i
+            where i.rank <= top_k
+        ), '[]'::jsonb),
+        'other_evidence', coalesce((
+            select jsonb_agg(jsonb_build_object('id', i.id, 'summary', coalesce(nullif(i.summary, ''), i.answer_summary)) order by i.id)
+            from items i
+            where i.rank > top_k
+        ), '[]'::jsonb)
+    );
+$$;
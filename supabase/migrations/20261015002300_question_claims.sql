@@ -0,0 +1,49 @@
+-- Question claims expire like report claims: a gatherer that is stopped or crashes mid-run no longer leaves its
+-- questions IN_PROGRESS for good (which also kept their reports from ever being scored).
+-- Questions handed to an OpenAI batch keep claimed_at null, since a batch may legitimately run for 24 hours.
+alter table research_questions add column if not exists claimed_at timestamptz;
+
+create or replace function get_next_unanswered_questions(limit_input int)
+returns table (id bigint, report_id bigint, question text, question_template text, country_name text)
+language sql
+as $$
+    with claimed as (
+        update research_questions rq
+        set status = 'IN_PROGRESS', claimed_at = now()
+        where rq.id in (
+            select q.id
+            from research_questions q
+            where q.status = 'PENDING'
+               or (q.status = 'IN_PROGRESS' and q.claimed_at < now() - interval '1 hour')
+            order by q.question_template, q.id
+            limit limit_input
+            for update skip locked
+        )
+        returning rq.id, rq.report_id, rq.question, rq.question_template
+    )
+    select c.id::bigint, c.report_id::bigint, c.question, c.question_template, r.country_name
+    from claimed c
+    join reports r on r.id = c.report_id
+    order by c.question_template, c.id;
+$$;
+
+-- Hands claimed but unanswered questions back to PENDING.
+create or replace function release_questions(question_ids bigint[])
+returns void
+language sql
+as $$
+    update research_questions
+    set status = 'PENDING', claimed_at = null
+    where id = any (question_ids) and status = 'IN_PROGRESS';
+$$;
+
+-- Questions already stranded by earlier runs become reclaimable, except those an open gather batch is answering.
+update research_questions
+set claimed_at = now()
+where status = 'IN_PROGRESS'
+  and claimed_at is null
+  and id not in (
+      select jsonb_array_elements_text(j.metadata -> 'question_ids')::bigint
+      from batch_jobs j
+      where j.kind = 'gather' and j.status = 'SUBMITTED'
+  );
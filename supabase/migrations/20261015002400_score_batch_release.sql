@@ -0,0 +1,32 @@
+-- A scoring batch claim now remembers the status it replaced, so a submit that fails before the upload completes
+-- can hand its reports back through release_reports instead of leaving them in SCORING_SUBMITTED.
+create or replace function get_next_reports_for_synthesis(limit_input int)
+returns table (id int, country_name text)
+language sql
+as $$
+    update reports r
+    set status = 'SCORING_SUBMITTED', claimed_from_status = r.status, claimed_at = now()
+    where r.id in (
+        select c.id
+        from reports c
+        where c.status not in ('SCORING_IN_PROGRESS', 'SCORING_SUBMITTED', 'REVIEW', 'NARRATIVE_IN_PROGRESS', 'NARRATIVE_SUBMITTED', 'COMPLETE', 'SCORING_FAILED', 'PLAN_FAILED')
+          and exists (select 1 from research_questions q where q.report_id = c.id)
+          and not exists (
+              select 1 from research_questions q
+              where q.report_id = c.id and q.status in ('PENDING', 'IN_PROGRESS')
+          )
+        order by c.id
+        limit limit_input
+        for update skip locked
+    )
+    returning r.id, r.country_name;
+$$;
+
+create or replace function release_reports(report_ids int[])
+returns void
+language sql
+as $$
+    update reports
+    set status = coalesce(claimed_from_status, status), claimed_from_status = null, claimed_at = null
+    where id = any (report_ids) and status in ('SCORING_IN_PROGRESS', 'SCORING_SUBMITTED', 'NARRATIVE_IN_PROGRESS');
+$$;
@@ -0,0 +1,36 @@
+-- Narrative batch claims remember the status they replaced too, so a failed submit can hand its reports back to
+-- REVIEW through release_reports instead of leaving them in NARRATIVE_SUBMITTED.
+create or replace function get_next_reports_for_narrative(limit_input int)
+returns table (id int, country_name text, score_card jsonb, evidence_json text)
+language sql
+as $$
+    with claimed as (
+        update reports r
+        set status = 'NARRATIVE_SUBMITTED', claimed_from_status = r.status, claimed_at = now()
+        where r.id in (
+            select c.id
+            from reports c
+            where c.status = 'REVIEW'
+              and exists (select 1 from index_scores s where s.report_id = c.id)
+            order by c.id
+            limit limit_input
+            for update skip locked
+        )
+        returning r.id, r.country_name
+    )
+    select c.id, c.country_name,
+           jsonb_build_object('report_id', s.report_id, 'country_name', s.country_name, 'final_score', s.final_score, 'score_data', s.score_data),
+           s.evidence_snapshot::text
+    from claimed c
+    join lateral (select * from index_scores i where i.report_id = c.id limit 1) s on true
+    order by c.id;
+$$;
+
+create or replace function release_reports(report_ids int[])
+returns void
+language sql
+as $$
+    update reports
+    set status = coalesce(claimed_from_status, status), claimed_from_status = null, claimed_at = null
+    where id = any (report_ids) and status in ('SCORING_IN_PROGRESS', 'SCORING_SUBMITTED', 'NARRATIVE_IN_PROGRESS', 'NARRATIVE_SUBMITTED');
+$$;
@@ -0,0 +1,50 @@
+-- NARRATIVE_FAILED is terminal, like SCORING_FAILED: the narrative stage gave up on the report for a reason a retry
+-- would repeat (no score card or snapshot, or a request OpenAI rejects), so scoring must not pick it up again either.
+create or replace function claim_next_k_reports_for_synthesis(k int)
+returns table (id int, country_name text)
+language sql
+as $$
+    update reports r
+    set status = 'SCORING_IN_PROGRESS',
+        claimed_from_status = case when r.status = 'SCORING_IN_PROGRESS' then r.claimed_from_status else r.status end,
+        claimed_at = now()
+    where r.id in (
+        select c.id
+        from reports c
+        where (
+            c.status not in ('SCORING_IN_PROGRESS', 'SCORING_SUBMITTED', 'REVIEW', 'NARRATIVE_IN_PROGRESS', 'NARRATIVE_SUBMITTED', 'NARRATIVE_FAILED', 'COMPLETE', 'SCORING_FAILED', 'PLAN_FAILED')
+            or (c.status = 'SCORING_IN_PROGRESS' and c.claimed_at < now() - interval '1 hour')
+        )
+          and exists (select 1 from research_questions q where q.report_id = c.id)
+          and not exists (
+              select 1 from research_questions q
+              where q.report_id = c.id and q.status in ('PENDING', 'IN_PROGRESS')
+          )
+        order by c.id
+        limit k
+        for update skip locked
+    )
+    returning r.id, r.country_name;
+$$;
+
+create or replace function get_next_reports_for_synthesis(limit_input int)
+returns table (id int, country_name text)
+language sql
+as $$
+    update reports r
+    set status = 'SCORING_SUBMITTED', claimed_from_status = r.status, claimed_at = now()
+    where r.id in (
+        select c.id
+        from reports c
+        where c.status not in ('SCORING_IN_PROGRESS', 'SCORING_SUBMITTED', 'REVIEW', 'NARRATIVE_IN_PROGRESS', 'NARRATIVE_SUBMITTED', 'NARRATIVE_FAILED', 'COMPLETE', 'SCORING_FAILED', 'PLAN_FAILED')
+          and exists (select 1 from research_questions q where q.report_id = c.id)
+          and not exists (
+              select 1 from research_questions q
+              where q.report_id = c.id and q.status in ('PENDING', 'IN_PROGRESS')
+          )
+        order by c.id
+        limit limit_input
+        for update skip locked
+    )
+    returning r.id, r.country_name;
+$$;
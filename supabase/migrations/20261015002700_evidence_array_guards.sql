@@ -0,0 +1,133 @@
+-- key_findings and sources are stored as the model returned them, which is not always an array ("N/A", an object).
+-- jsonb_array_elements raises on those, and one such row failed the evidence read for every report in a claim.
+-- Each expansion now treats a non-array as empty, and get_all_evidence_for_report only trims quotes on objects.
+create or replace function get_all_evidence_for_report(report_id_input int)
+returns table (id bigint, question text, answer_summary text, key_findings jsonb, sources jsonb, model text, summary text)
+language sql
+stable
+as $$
+    select
+        e.id::bigint,
+        q.question,
+        e.answer_summary,
+        e.key_findings,
+        (
+            select coalesce(jsonb_agg(distinct
+                case when jsonb_typeof(s) = 'object' and s ? 'quote' then jsonb_set(s, '{quote}', to_jsonb(left(s ->> 'quote', 500))) else s end
+            ), '[]'::jsonb)
+            from jsonb_array_elements(case when jsonb_typeof(e.sources) = 'array' then e.sources else '[]'::jsonb end) as s
+        ) as sources,
+        e.model,
+        e.summary
+    from evidence_items e
+    join research_questions q on q.id = e.question_id
+    where q.report_id = report_id_input
+    order by e.id;
+$$;
+
+create or replace function compact_evidence(report_id_input int, brief boolean default false)
+returns jsonb
+language sql
+stable
+as $$
+    with items as (
+        select e.*, coalesce(e.summary, '') <> '' as summarised
+        from distinct_evidence(report_id_input) e
+    ),
+    cited as (
+        select i.id as item_id, s.ord, s.source, coalesce(s.source ->> 'url', s.source ->> 'title') as source_key
+        from items i, jsonb_array_elements(case when jsonb_typeof(i.sources) = 'array' then i.sources else '[]'::jsonb end) with ordinality as s(source, ord)
+        where coalesce(s.source ->> 'url', s.source ->> 'title') is not null
+    ),
+    numbered as (
+        select source_key,
+               'S' || row_number() over (order by min(array[item_id, ord])) as ref,
+               (array_agg(source - 'quote' order by item_id, ord))[1] as source
+        from cited
+        group by source_key
+    )
+    select jsonb_build_object(
+        'sources', coalesce((select jsonb_object_agg(n.ref, n.source) from numbered n), '{}'::jsonb),
+        'evidence', coalesce((
+            select jsonb_agg(
+                case
+                    when i.summarised then jsonb_build_object('id', i.id, 'summary', i.summary)
+                    when brief then jsonb_build_object(
+                        'question', i.question,
+                        'answer_summary', i.answer_summary,
+                        'key_findings', coalesce((
+                            select jsonb_agg(f.finding order by f.ord)
+                            from jsonb_array_elements(case when jsonb_typeof(i.key_findings) = 'array' then i.key_findings else '[]'::jsonb end) with ordinality as f(finding, ord)
+                            where f.ord <= 3
+                        ), '[]'::jsonb)
+                    )
+                    else to_jsonb(i) - 'sources' - 'summarised' - 'relevance_score'
+                end
+                || jsonb_build_object('sources', coalesce((
+                    select jsonb_agg(
+                        case when brief or i.summarised or coalesce(c.source ->> 'quote', '') = '' then to_jsonb(n.ref)
+                             else jsonb_build_object('source', n.ref, 'quote', c.source -> 'quote') end
+                        order by c.ord
+                    )
+                    from cited c
+                    join numbered n on n.source_key = c.source_key
+                    where c.item_id = i.id
+                ), '[]'::jsonb))
+                order by i.id
+            )
+            from items i
+        ), '[]'::jsonb)
+    );
+$$;
+
+create or replace function narrative_evidence(report_id_input int, top_k int)
+returns jsonb
+language sql
+stable
+as $$
+    with items as (
+        select e.id, e.question, e.answer_summary, e.key_findings, e.sources, e.summary,
+               row_number() over (order by e.relevance_score desc nulls last, e.id) as rank
+        from distinct_evidence(report_id_input) e
+    ),
+    cited as (
+        select i.id as item_id, s.ord, s.source, coalesce(s.source ->> 'url', s.source ->> 'title') as source_key
+        from items i, jsonb_array_elements(case when jsonb_typeof(i.sources) = 'array' then i.sources else '[]'::jsonb end) with ordinality as s(source, ord)
+        where i.rank <= top_k and coalesce(s.source ->> 'url', s.source ->> 'title') is not null
+    ),
+    numbered as (
+        select source_key,
+               'S' || row_number() over (order by min(array[item_id, ord])) as ref,
+               (array_agg(source - 'quote' order by item_id, ord))[1] as source
+        from cited
+        group by source_key
+    )
+    select jsonb_build_object(
+        'sources', coalesce((select jsonb_object_agg(n.ref, n.source) from numbered n), '{}'::jsonb),
+        'top_evidence', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                'id', i.id,
+                'question', i.question,
+                'answer_summary', i.answer_summary,
+                'key_findings', coalesce((
+                    select jsonb_agg(f.finding order by f.ord)
+                    from jsonb_array_elements(case when jsonb_typeof(i.key_findings) = 'array' then i.key_findings else '[]'::jsonb end) with ordinality as f(finding, ord)
+                    where f.ord <= 3
+                ), '[]'::jsonb),
+                'sources', coalesce((
+                    select jsonb_agg(n.ref order by c.ord)
+                    from cited c
+                    join numbered n on n.source_key = c.source_key
+                    where c.item_id = i.id
+                ), '[]'::jsonb)
+            ) order by i.rank)
+            from items i
+            where i.rank <= top_k
+        ), '[]'::jsonb),
+        'other_evidence', coalesce((
+            select jsonb_agg(jsonb_build_object('id', i.id, 'summary', coalesce(nullif(i.summary, ''), i.answer_summary)) order by i.id)
+            from items i
+            where i.rank > top_k
+        ), '[]'::jsonb)
+    );
+$$;
@@ -0,0 +1,19 @@
+-- Released questions are PENDING again but fire no insert trigger, so release_questions wakes `gather --follow`
+-- workers itself. (Expired claims still wake nobody; the workers also re-check on a timer for those.)
+create or replace function release_questions(question_ids bigint[])
+returns void
+language plpgsql
+as $$
+declare
+    released int;
+begin
+    update research_questions
+    set status = 'PENDING', claimed_at = null
+    where id = any (question_ids) and status = 'IN_PROGRESS';
+    get diagnostics released = row_count;
+
+    if released > 0 then
+        perform pg_notify('new_question', '');
+    end if;
+end;
+$$;
@@ -0,0 +1,16 @@
+-- A streaming checkpoint (is_partial) is a truncated draft left behind by a failed or released narrative run;
+-- the bundle only ever carries the finished article.
+create or replace function get_report_bundle(report_id_input int)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'country_name', r.country_name,
+        'narrative', (select pc.final_article_text from published_content pc where pc.report_id = r.id and not pc.is_partial),
+        'score_card', (select to_jsonb(s) - 'evidence_snapshot' from index_scores s where s.report_id = r.id limit 1),
+        'evidence', coalesce((select jsonb_agg(to_jsonb(e)) from get_all_evidence_for_report(r.id) e), '[]'::jsonb)
+    )
+    from reports r
+    where r.id = report_id_input;
+$$;
@@ -0,0 +1,14 @@
+-- The planner's country-neutral prompt is identical for every country, so its embedding was too: every lookup after
+-- the first was a distance-0 hit and the vector search decided nothing. Templates are now keyed by the prompt's
+-- hash, which changes exactly when the model, wording or sub-points do.
+alter table llm_cache add column if not exists prompt_key text;
+
+-- Entries from the embedding era were templated by plain substring replacement and never checked for demonyms,
+-- so they may replay one country's wording (or a mangled "Nigeria") for others. Planning regenerates them.
+delete from llm_cache where prompt_key is null;
+
+alter table llm_cache alter column prompt_key set not null;
+alter table llm_cache drop column if exists embedding;
+create unique index if not exists llm_cache_scope_prompt_key_idx on llm_cache (scope, prompt_key);
+
+drop function if exists match_llm_cache(text, vector, float);